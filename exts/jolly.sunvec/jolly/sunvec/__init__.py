@@ -1 +1,8 @@
-from .extension import *
+# The solar, calendar and color math (see core.py) imports without Kit, e.g. in worker processes or on
+# render-farm nodes; the extension and its USD/omni dependencies are only loaded inside Omniverse.
+try:
+    import omni.ext
+except ImportError:
+    pass
+else:
+    from .extension import *
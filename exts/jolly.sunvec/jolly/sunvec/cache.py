@@ -0,0 +1,119 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import numpy as np
+from jolly.sunvec.engines import ENGINE_STANDARD, engine_angles
+from jolly.sunvec.sunpos import sun_directions
+
+"""
+SunposCache memoizes solar positions across rebuilds.
+Keys are whole batches: (digest of the quantized UTC instants, latitude, longitude, refraction, engine); values are
+the (azimuth, elevation, directions) arrays of the batch. A rebuild that samples the same instants again is served
+by one dict lookup instead of one per sample. The cache is shared by the UI thread and the rebuild worker, so every
+read or write of its entries holds [lock]; batches are solved outside it.
+"""
+
+# Rough cost of one entry beyond its arrays: key tuple, digest, array headers and the OrderedDict node.
+ENTRY_BYTES = 512
+
+class SunposCache():
+    """
+    [SunposCache(max_bytes, quantum)] is an LRU cache of at most about [max_bytes] of solar position batches;
+    instants are quantized to [quantum] seconds and locations to 1e-6 degrees.
+    """
+    def __init__(self, max_bytes=16 * 2**20, quantum=1):
+        self.quantum = quantum
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.resize(max_bytes)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resize(self, max_bytes):
+        """[resize(max_bytes)] changes the memory cap, evicting the least recently used batches if needed."""
+        with self.lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self.evict()
+
+    def evict(self):
+        # Callers hold [self.lock].
+        while self.bytes > self.max_bytes:
+            _, value = self.entries.popitem(last=False)
+            self.bytes -= entry_bytes(value)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def reset_counters(self):
+        """[reset_counters()] zeroes the hit/miss counters, keeping the cached batches."""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """[stats()] is a dict of the hit/miss counters (in samples) and current size of the cache."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def lookup(self, utc_epochs, location, refraction, engine=ENGINE_STANDARD):
+        """[lookup(utc_epochs, location, refraction, engine)] is (azimuth, elevation, directions) for every UTC epoch
+        (seconds since 2000-01-01 00:00) at [location] solved by the tier [engine] (see engines.py); like
+        [sunpos.sunpos_daynum] but served from the cache.
+        NOTE: Batches larger than the whole cache are computed and returned without being kept."""
+        quantized = np.ascontiguousarray(np.floor_divide(np.asarray(utc_epochs, dtype=np.int64), self.quantum))
+        key = (hashlib.sha1(quantized.tobytes()).digest(), len(quantized), \
+            round(location[0], 6), round(location[1], 6), bool(refraction), engine)
+
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += len(quantized)
+            else:
+                self.misses += len(quantized)
+        if value is not None:
+            return tuple(array.copy() for array in value)
+
+        azimuth, elevation = self.solve(quantized, key[2], key[3], key[4], engine)
+        value = (azimuth, elevation, sun_directions(azimuth, elevation))
+        stored = tuple(array.copy() for array in value)
+        with self.lock:
+            # Another thread may have solved the same batch meanwhile.
+            if key not in self.entries and entry_bytes(stored) <= self.max_bytes:
+                self.entries[key] = stored
+                self.bytes += entry_bytes(stored)
+                self.evict()
+        return value
+
+    def solve(self, quantized, latitude, longitude, refraction, engine=ENGINE_STANDARD):
+        daynum = quantized * self.quantum / 86400 - 0.5
+        return engine_angles(engine, daynum, latitude, longitude, refraction)
+
+    def positions(self, settings, refraction, engine=ENGINE_STANDARD):
+        """[positions(settings, refraction, engine)] is [lookup] for every instant of the SettingArray [settings]."""
+        return self.lookup(settings.utc_epochs(), settings.get_loc(), refraction, engine)
+
+    def sunpos(self, setting, refraction, engine=ENGINE_STANDARD):
+        """[sunpos(setting, refraction, engine)] is the (azimuth, elevation) of the sun for one Setting, like [sunpos.sunpos]."""
+        azimuth, elevation, _ = self.lookup([setting.epoch - setting.timezone * 3600], setting.get_loc(), refraction, engine)
+        return (float(azimuth[0]), float(elevation[0]))
+
+def entry_bytes(value):
+    """[entry_bytes(value)] is the approximate memory held by one cached batch [value]."""
+    return ENTRY_BYTES + sum(array.nbytes for array in value)
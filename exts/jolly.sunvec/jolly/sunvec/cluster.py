@@ -0,0 +1,50 @@
+import numpy as np
+from jolly.sunvec.setting import CHUNK_SIZE
+
+"""
+Spherical k-means for collapsing many sun samples into a few representative lights.
+"""
+
+def nearest_centers(directions, centers, chunk=CHUNK_SIZE):
+    """[nearest_centers(directions, centers)] is the index of the closest of [centers] (by angle) for every direction."""
+    labels = np.empty(len(directions), dtype=np.int64)
+    for first in range(0, len(directions), chunk):
+        labels[first:first + chunk] = np.argmax(directions[first:first + chunk] @ centers.T, axis=1)
+    return labels
+
+def spherical_kmeans(directions, k, weights=None, iterations=25):
+    """[spherical_kmeans(directions, k, weights, iterations)] is (centers, labels): at most [k] unit vectors
+    and the cluster of every row of the (N, 3) unit vectors [directions], grouped by angle and weighted by [weights].
+    NOTE: Seeds are spread evenly through the samples, so time-ordered sun paths start from a good guess."""
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    weights = np.ones(len(directions)) if weights is None else np.asarray(weights, dtype=np.float64)
+    k = max(1, min(k, len(directions)))
+    centers = directions[np.linspace(0, len(directions) - 1, k).round().astype(np.int64)].copy()
+    labels = None
+    for _ in range(iterations):
+        new_labels = nearest_centers(directions, centers)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        sums = np.zeros((k, 3))
+        for axis in range(3):
+            sums[:, axis] = np.bincount(labels, weights=weights * directions[:, axis], minlength=k)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0  # Empty clusters keep their previous center.
+        centers[filled] = sums[filled] / norms[filled, None]
+    return centers, labels
+
+def collapse(directions, colors, intensities, k):
+    """[collapse(directions, colors, intensities, k)] is (directions, colors, intensities) of at most [k] lights
+    standing in for all samples: each light points at its cluster's center, emits the cluster's summed intensity
+    and the intensity-weighted mean of its colors."""
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    intensities = np.broadcast_to(np.asarray(intensities, dtype=np.float64), (len(colors),))
+    centers, labels = spherical_kmeans(directions, k, intensities)
+    count = len(centers)
+    summed = np.bincount(labels, weights=intensities, minlength=count)
+    mixed = np.stack([np.bincount(labels, weights=intensities * colors[:, channel], minlength=count) \
+        for channel in range(3)], axis=1)
+    mixed /= np.maximum(summed, 1e-12)[:, None]
+    used = summed > 0
+    return centers[used], mixed[used], summed[used]
@@ -2,9 +2,15 @@ import omni.ext
 from pxr import Sdf, Gf
 import omni.kit.commands
 import omni.usd
+from jolly.sunvec.profiling import PROFILER
+
+def run_command(command_name, **kwargs):
+    """[run_command(command_name, **kwargs)] executes the kit command [command_name], counting it for the profiler."""
+    PROFILER.count("commands")
+    return omni.kit.commands.execute(command_name, **kwargs)
 
 def create_sphere(path, name, x,y,z, rad):
-    omni.kit.commands.execute('CreatePrimWithDefaultXform',
+    run_command('CreatePrimWithDefaultXform',
         prim_type='Sphere',
         prim_path= f"/World/{name}",
         attributes={
@@ -12,13 +18,13 @@ def create_sphere(path, name, x,y,z, rad):
             'extent': [(-50, -50, -50), (50, 50, 50)]
             }
         )
-    omni.kit.commands.execute('ChangeProperty',
+    run_command('ChangeProperty',
         prop_path=Sdf.Path(F"{path}{name}.xformOp:translate"),
         value=Gf.Vec3d(x,y,z),
         prev=Gf.Vec3d(x,y,z))
             
 def create_sphere(path, name, vec3d, rad, ):
-    omni.kit.commands.execute('CreatePrimWithDefaultXform',
+    run_command('CreatePrimWithDefaultXform',
         prim_type='Sphere',
         prim_path= f"{path}{name}",
         attributes={
@@ -26,20 +32,22 @@ def create_sphere(path, name, vec3d, rad, ):
             'extent': [(-50, -50, -50), (50, 50, 50)]
             }
         )
-    omni.kit.commands.execute('ChangeProperty',
+    run_command('ChangeProperty',
         prop_path=Sdf.Path(f"{path}{name}.xformOp:translate"),
         value=vec3d,
         prev=vec3d)
 
 def create_scope(path):
-    omni.kit.commands.execute('CreatePrimWithDefaultXform',
+    PROFILER.count("prims created")
+    run_command('CreatePrimWithDefaultXform',
         prim_type='Scope',
         prim_path= f"{path}",
         attributes={}
         )
 
 def create_distant_light(path, name):
-    omni.kit.commands.execute('CreatePrim',
+    PROFILER.count("prims created")
+    run_command('CreatePrim',
                     prim_path=f"{path}{name}",
                     prim_type='DistantLight',
                     select_new_prim=False,
@@ -47,27 +55,29 @@ def create_distant_light(path, name):
                     create_default_xform=True)
 
 def color_distant_light(path, name, rgb):
-    omni.kit.commands.execute('ChangeProperty',
+    run_command('ChangeProperty',
                         prop_path=Sdf.Path(F"{path}{name}.color"),
                         value = rgb,
                         prev = (1,1,1))
 
 def intensity_distant_light(path, name, intensity):
-    omni.kit.commands.execute('ChangeProperty',
+    run_command('ChangeProperty',
                         prop_path=Sdf.Path(F"{path}{name}.intensity"),
                         value = intensity,
                         prev = 100)
 
 def orient_distant_light(path, name, vec3dspherical):
-    omni.kit.commands.execute('ChangeProperty',
+    run_command('ChangeProperty',
                         prop_path=Sdf.Path(F"{path}{name}.xformOp:rotateXYZ"),
                         value = vec3dspherical,
                         prev = vec3dspherical)
 
 def delete(path):
-    omni.kit.commands.execute('DeletePrims',
+    PROFILER.count("prims deleted")
+    run_command('DeletePrims',
         paths=[path])
 
 def delete_all(paths):
-    omni.kit.commands.execute('DeletePrims',
+    PROFILER.count("prims deleted", len(paths))
+    run_command('DeletePrims',
         paths=paths)
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""
+Kit-free core of jolly.sunvec: solar positions, calendar math and color palettes.
+Only the standard library and NumPy are needed, so this is safe to import in multiprocessing
+workers and batch jobs; USD/omni are only pulled in by the authoring modules and the extension.
+"""
+from jolly.sunvec.cache import SunposCache
+from jolly.sunvec.engines import ENGINE_FAST, ENGINE_NAMES, ENGINE_PRECISE, ENGINE_STANDARD, engine_angles, \
+    engine_positions, precise_angles
+from jolly.sunvec.sampling import adaptive_array, adaptive_epochs
+from jolly.sunvec.setting import CHUNK_SIZE, Setting, SettingArray, SettingRange, Timespan
+from jolly.sunvec.skybake import bake_sky, rasterize, read_hdr, remove_skies, write_hdr
+from jolly.sunvec.sites import batch_arrays, batch_positions, load_sites_csv
+from jolly.sunvec.spectrum import DEUTERANOPIA, FULLCOLOR, GRAYSCALE, PROTANOPIA, TRITANOPIA, RingColor, Spectrum, \
+    ring_palette
+from jolly.sunvec.sunpath import sun_path_curves
+from jolly.sunvec.sunpos import into_range, solar_angles, sun_directions, sunpos, sunpos_batch, sunpos_daynum
+from jolly.sunvec.util import deg, rad, theta_phi_to_xyz
@@ -0,0 +1,249 @@
+import numpy as np
+from jolly.sunvec.sunpos import solar_angles, sun_directions
+
+"""
+Solar position engines: one interface, three accuracy/throughput tiers.
+
+Every engine is a function [angles(daynum, lat, long, refraction)] -> (azimuth, elevation) in degrees, vectorized over
+UTC days from J2000 [daynum] (see [sunpos.sunpos_daynum]). Accuracy is the largest angle to ENGINE_PRECISE with the
+sun above 5 degrees over 1901-2099; cost is per sample on one core with NumPy (see tools/scripts/bench_sunvec.py):
+
+  ENGINE_FAST      float32 trigonometry, constant obliquity and one          ~0.04 deg     ~150 ns/sample
+                   equation-of-center term.
+  ENGINE_STANDARD  [sunpos.solar_angles], the model the extension always     ~0.02 deg     ~400 ns/sample
+                   used; results rounded to 0.01 deg, only valid 1901-2099.
+  ENGINE_PRECISE   vectorized NREL SPA (Reda & Andreas 2008): the periodic   0.00003 deg   ~9 us/sample
+                   terms of its earth tables, low-accuracy nutation          on the SPA
+                   (Meeus 22), estimated delta T, aberration, topocentric    example
+                   parallax and pressure/temperature refraction; valid far
+                   outside 1901-2099.
+
+Use the fast tier for interactive previews and the precise tier for final bakes.
+"""
+
+ENGINE_FAST = 0
+ENGINE_STANDARD = 1
+ENGINE_PRECISE = 2
+
+ENGINE_NAMES = ("Fast", "Standard", "Precise (SPA)")
+
+TAU = 2 * np.pi
+
+#----------#
+#   fast   #
+#----------#
+
+def fast_angles(daynum, lat, long, refraction=True):
+    """[fast_angles(daynum, lat, long, refraction)] is (azimuth, elevation) in degrees of [ENGINE_FAST]."""
+    # The three angles that grow with time are wrapped in float64 first; float32 days alone are minutes off.
+    daynum = np.asarray(daynum, dtype=np.float64)
+    mean_long = ((4.894967873 + 0.01720279239 * daynum) % TAU).astype(np.float32)
+    mean_anom = ((6.240040768 + 0.01720197034 * daynum) % TAU).astype(np.float32)
+    sidereal = ((4.894961213 + 6.300388099 * daynum + np.radians(long)) % TAU).astype(np.float32)
+    rlat = np.float32(np.radians(lat))
+    sin, cos = np.sin, np.cos
+    eclip_long = mean_long + np.float32(0.03342305518) * sin(mean_anom)
+    obliquity = np.float32(0.4090877234)
+    rasc = np.arctan2(cos(obliquity) * sin(eclip_long), cos(eclip_long))
+    decl = np.arcsin(sin(obliquity) * sin(eclip_long))
+    hour_ang = sidereal - rasc
+    elevation = np.arcsin(sin(decl) * sin(rlat) + cos(decl) * cos(rlat) * cos(hour_ang))
+    azimuth = np.arctan2(-cos(decl) * cos(rlat) * sin(hour_ang), sin(decl) - sin(rlat) * sin(elevation))
+    azimuth = np.degrees(azimuth) % np.float32(360)
+    elevation = np.degrees(elevation)
+    if refraction:
+        targ = np.radians(elevation + np.float32(10.3) / (elevation + np.float32(5.11)))
+        elevation = elevation + (np.float32(1.02) / np.tan(targ)) / np.float32(60)
+    return (azimuth, elevation)
+
+#--------------#
+#   standard   #
+#--------------#
+
+def standard_angles(daynum, lat, long, refraction=True):
+    """[standard_angles(daynum, lat, long, refraction)] is (azimuth, elevation) in degrees of [ENGINE_STANDARD]."""
+    return solar_angles(np.asarray(daynum, dtype=np.float64), lat, long, refraction)
+
+#-------------#
+#   precise   #
+#-------------#
+
+# Periodic terms (A, B, C) of the earth's heliocentric longitude, latitude and radius: A * cos(B + C * JME).
+L_TERMS = (
+    ((175347046, 0, 0), (3341656, 4.6692568, 6283.07585), (34894, 4.6261, 12566.1517), (3497, 2.7441, 5753.3849),
+     (3418, 2.8289, 3.5231), (3136, 3.6277, 77713.7715), (2676, 4.4181, 7860.4194), (2343, 6.1352, 3930.2097),
+     (1324, 0.7425, 11506.7698), (1273, 2.0371, 529.691), (1199, 1.1096, 1577.3435), (990, 5.233, 5884.927),
+     (902, 2.045, 26.298), (857, 3.508, 398.149), (780, 1.179, 5223.694), (753, 2.533, 5507.553),
+     (505, 4.583, 18849.228), (492, 4.205, 775.523), (357, 2.92, 0.067), (317, 5.849, 11790.629),
+     (284, 1.899, 796.298), (271, 0.315, 10977.079), (243, 0.345, 5486.778), (206, 4.806, 2544.314),
+     (205, 1.869, 5573.143), (202, 2.458, 6069.777), (156, 0.833, 213.299), (132, 3.411, 2942.463),
+     (126, 1.083, 20.775), (115, 0.645, 0.98), (103, 0.636, 4694.003), (102, 0.976, 15720.839),
+     (102, 4.267, 7.114), (99, 6.21, 2146.17), (98, 0.68, 155.42), (86, 5.98, 161000.69),
+     (85, 1.3, 6275.96), (85, 3.67, 71430.7), (80, 1.81, 17260.15), (79, 3.04, 12036.46),
+     (75, 1.76, 5088.63), (74, 3.5, 3154.69), (74, 4.68, 801.82), (70, 0.83, 9437.76),
+     (62, 3.98, 8827.39), (61, 1.82, 7084.9), (57, 2.78, 6286.6), (56, 4.39, 14143.5),
+     (56, 3.47, 6279.55), (52, 0.19, 12139.55), (52, 1.33, 1748.02), (51, 0.28, 5856.48),
+     (49, 0.49, 1194.45), (41, 5.37, 8429.24), (41, 2.4, 19651.05), (39, 6.17, 10447.39),
+     (37, 6.04, 10213.29), (37, 2.57, 1059.38), (36, 1.71, 2352.87), (36, 1.78, 6812.77),
+     (33, 0.59, 17789.85), (30, 0.44, 83996.85), (30, 2.74, 1349.87), (25, 3.16, 4690.48)),
+    ((628331966747, 0, 0), (206059, 2.678235, 6283.07585), (4303, 2.6351, 12566.1517), (425, 1.59, 3.523),
+     (119, 5.796, 26.298), (109, 2.966, 1577.344), (93, 2.59, 18849.23), (72, 1.14, 529.69),
+     (68, 1.87, 398.15), (67, 4.41, 5507.55), (59, 2.89, 5223.69), (56, 2.17, 155.42),
+     (45, 0.4, 796.3), (36, 0.47, 775.52), (29, 2.65, 7.11), (21, 5.34, 0.98),
+     (19, 1.85, 5486.78), (19, 4.97, 213.3), (17, 2.99, 6275.96), (16, 0.03, 2544.31),
+     (16, 1.43, 2146.17), (15, 1.21, 10977.08), (12, 2.83, 1748.02), (12, 3.26, 5088.63),
+     (12, 5.27, 1194.45), (12, 2.08, 4694), (11, 0.77, 553.57), (10, 1.3, 6286.6),
+     (10, 4.24, 1349.87), (9, 2.7, 242.73), (9, 5.64, 951.72), (8, 5.3, 2352.87),
+     (6, 2.65, 9437.76), (6, 4.67, 4690.48)),
+    ((52919, 0, 0), (8720, 1.0721, 6283.0758), (309, 0.867, 12566.152), (27, 0.05, 3.52),
+     (16, 5.19, 26.3), (16, 3.68, 155.42), (10, 0.76, 18849.23), (9, 2.06, 77713.77),
+     (7, 0.83, 775.52), (5, 4.66, 1577.34), (4, 1.03, 7.11), (4, 3.44, 5573.14),
+     (3, 5.14, 796.3), (3, 6.05, 5507.55), (3, 1.19, 242.73), (3, 6.12, 529.69),
+     (3, 0.31, 398.15), (3, 2.28, 553.57), (2, 4.38, 5223.69), (2, 3.75, 0.98)),
+    ((289, 5.844, 6283.076), (35, 0, 0), (17, 5.49, 12566.15), (3, 5.2, 155.42),
+     (1, 4.72, 3.52), (1, 5.3, 18849.23), (1, 5.97, 242.73)),
+    ((114, 3.142, 0), (8, 4.13, 6283.08), (1, 3.84, 12566.15)),
+    ((1, 3.14, 0),),
+)
+B_TERMS = (
+    ((280, 3.199, 84334.662), (102, 5.422, 5507.553), (80, 3.88, 5223.69), (44, 3.7, 2352.87), (32, 4, 1577.34)),
+    ((9, 3.9, 5507.55), (6, 1.73, 5223.69)),
+)
+R_TERMS = (
+    ((100013989, 0, 0), (1670700, 3.0984635, 6283.07585), (13956, 3.05525, 12566.1517), (3084, 5.1985, 77713.7715),
+     (1628, 1.1739, 5753.3849), (1576, 2.8469, 7860.4194), (925, 5.453, 11506.77), (542, 4.564, 3930.21),
+     (472, 3.661, 5884.927), (346, 0.964, 5507.553), (329, 5.9, 5223.694), (307, 0.299, 5573.143),
+     (243, 4.273, 11790.629), (212, 5.847, 1577.344), (186, 5.022, 10977.079), (175, 3.012, 18849.228),
+     (110, 5.055, 5486.778), (98, 0.89, 6069.78), (86, 5.69, 15720.84), (86, 1.27, 161000.69),
+     (65, 0.27, 17260.15), (63, 0.92, 529.69), (57, 2.01, 83996.85), (56, 5.24, 71430.7),
+     (49, 3.25, 2544.31), (47, 2.58, 775.52), (45, 5.54, 9437.76), (43, 6.01, 6275.96),
+     (39, 5.36, 4694), (38, 2.39, 8827.39), (37, 0.83, 19651.05), (37, 4.9, 12139.55),
+     (36, 1.67, 12036.46), (35, 1.84, 2942.46), (33, 0.24, 7084.9), (32, 0.18, 5088.63),
+     (32, 1.78, 398.15), (28, 1.21, 6286.6), (28, 1.9, 6279.55), (26, 4.59, 10447.39)),
+    ((103019, 1.10749, 6283.07585), (1721, 1.0644, 12566.1517), (702, 3.142, 0), (32, 1.02, 18849.23),
+     (31, 2.84, 5507.55), (25, 1.32, 5223.69), (18, 1.42, 1577.34), (10, 5.91, 10977.08),
+     (9, 1.42, 6275.96), (9, 0.27, 5486.78)),
+    ((4359, 5.7846, 6283.0758), (124, 5.579, 12566.152), (12, 3.14, 0), (9, 3.63, 77713.77),
+     (6, 1.87, 5573.14), (3, 5.47, 18849.23)),
+    ((145, 4.273, 6283.076), (7, 3.92, 12566.15)),
+    ((4, 2.56, 6283.08),),
+)
+TERM_ARRAYS = tuple(tuple(np.array(terms, dtype=np.float64) for terms in series) for series in (L_TERMS, B_TERMS, R_TERMS))
+
+# Standard atmosphere of the refraction correction, and the sun's apparent radius plus refraction at the horizon.
+PRESSURE = 1010.0  # millibars
+TEMPERATURE = 10.0  # degrees Celsius
+HORIZON_REFRACTION = 0.5667 + 0.26667  # degrees
+
+SERIES_CHUNK = 8192  # Samples per slice of [earth_series]; its (terms, samples) cosine table stays under ~4 MB.
+
+def earth_series(series, jme):
+    """[earth_series(series, jme)] is the sum over powers k of jme^k * sum(A * cos(B + C * jme)) of the periodic
+    terms [series], divided by 1e8; solved SERIES_CHUNK samples at a time so memory stays bounded."""
+    total = np.zeros_like(jme)
+    for first in range(0, len(jme), SERIES_CHUNK):
+        chunk = jme[first:first + SERIES_CHUNK]
+        for power, terms in enumerate(series):
+            total[first:first + SERIES_CHUNK] += terms[:, 0] @ np.cos(terms[:, 1][:, None] + terms[:, 2][:, None] * chunk) \
+                * chunk ** power
+    return total / 1e8
+
+def delta_t(daynum):
+    """[delta_t(daynum)] is the estimated difference TT - UT in seconds (Espenak & Meeus polynomials)."""
+    year = 2000 + np.asarray(daynum, dtype=np.float64) / 365.25
+    t = year - 2000
+    long_term = -20 + 32 * ((year - 1820) / 100) ** 2
+    return np.select(
+        [year < 1900, year < 1920, year < 1941, year < 1961, year < 1986, year < 2005, year < 2050, year < 2150],
+        [long_term,
+         -2.79 + 1.494119 * (year - 1900) - 0.0598939 * (year - 1900) ** 2 + 0.0061966 * (year - 1900) ** 3 \
+            - 0.000197 * (year - 1900) ** 4,
+         21.20 + 0.84493 * (year - 1920) - 0.076100 * (year - 1920) ** 2 + 0.0020936 * (year - 1920) ** 3,
+         29.07 + 0.407 * (year - 1950) - (year - 1950) ** 2 / 233 + (year - 1950) ** 3 / 2547,
+         45.45 + 1.067 * (year - 1975) - (year - 1975) ** 2 / 260 - (year - 1975) ** 3 / 718,
+         63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3 + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5,
+         62.92 + 0.32217 * t + 0.005589 * t ** 2,
+         long_term - 0.5628 * (2150 - year)],
+        long_term)
+
+def precise_angles(daynum, lat, long, refraction=True, elevation=0.0, pressure=PRESSURE, temperature=TEMPERATURE, \
+        delta_t_seconds=None):
+    """[precise_angles(daynum, lat, long, refraction, elevation, pressure, temperature, delta_t_seconds)] is the
+    topocentric (azimuth, elevation) in degrees of [ENGINE_PRECISE] for an observer [elevation] meters above sea
+    level; [delta_t_seconds] defaults to [delta_t]."""
+    daynum = np.atleast_1d(np.asarray(daynum, dtype=np.float64))
+    rlat = np.radians(lat)
+    delta_t_seconds = delta_t(daynum) if delta_t_seconds is None else delta_t_seconds
+    jc = daynum / 36525
+    jce = (daynum + delta_t_seconds / 86400) / 36525
+    jme = jce / 10
+
+    # Heliocentric, then geocentric, ecliptic position of the sun.
+    l_series, b_series, r_series = TERM_ARRAYS
+    helio_long = np.degrees(earth_series(l_series, jme)) % 360
+    helio_lat = np.degrees(earth_series(b_series, jme))
+    radius = earth_series(r_series, jme)
+    geo_long = (helio_long + 180) % 360
+    geo_lat = -helio_lat
+
+    # Nutation (low accuracy) and the true obliquity of the ecliptic.
+    node = np.radians(125.04452 - 1934.136261 * jce)
+    sun_long = np.radians(280.4665 + 36000.7698 * jce)
+    moon_long = np.radians(218.3165 + 481267.8813 * jce)
+    nutation_long = (-17.20 * np.sin(node) - 1.32 * np.sin(2 * sun_long) - 0.23 * np.sin(2 * moon_long) \
+        + 0.21 * np.sin(2 * node)) / 3600
+    nutation_obliq = (9.20 * np.cos(node) + 0.57 * np.cos(2 * sun_long) + 0.10 * np.cos(2 * moon_long) \
+        - 0.09 * np.cos(2 * node)) / 3600
+    u = jme / 10
+    mean_obliq = 84381.448 + u * (-4680.93 + u * (-1.55 + u * (1999.25 + u * (-51.38 + u * (-249.67 + u * (-39.05 \
+        + u * (7.12 + u * (27.87 + u * (5.79 + u * 2.45)))))))))
+    obliq = np.radians(mean_obliq / 3600 + nutation_obliq)
+
+    # Apparent sun longitude (aberration) and sidereal time at Greenwich.
+    apparent_long = np.radians(geo_long + nutation_long - 20.4898 / (3600 * radius))
+    sidereal = (280.46061837 + 360.98564736629 * daynum + 0.000387933 * jc ** 2 - jc ** 3 / 38710000) % 360
+    sidereal += nutation_long * np.cos(obliq)
+
+    # Geocentric right ascension, declination and local hour angle.
+    beta = np.radians(geo_lat)
+    rasc = np.arctan2(np.sin(apparent_long) * np.cos(obliq) - np.tan(beta) * np.sin(obliq), np.cos(apparent_long))
+    decl = np.arcsin(np.sin(beta) * np.cos(obliq) + np.cos(beta) * np.sin(obliq) * np.sin(apparent_long))
+    hour_ang = np.radians(sidereal + long) - rasc
+
+    # Topocentric parallax.
+    parallax = np.radians(8.794 / (3600 * radius))
+    reduced = np.arctan(0.99664719 * np.tan(rlat))
+    x = np.cos(reduced) + elevation / 6378140 * np.cos(rlat)
+    y = 0.99664719 * np.sin(reduced) + elevation / 6378140 * np.sin(rlat)
+    denominator = np.cos(decl) - x * np.sin(parallax) * np.cos(hour_ang)
+    delta_rasc = np.arctan2(-x * np.sin(parallax) * np.sin(hour_ang), denominator)
+    topo_decl = np.arctan2((np.sin(decl) - y * np.sin(parallax)) * np.cos(delta_rasc), denominator)
+    topo_hour = hour_ang - delta_rasc
+
+    # Topocentric elevation and azimuth (from north, eastward).
+    altitude = np.degrees(np.arcsin(np.sin(rlat) * np.sin(topo_decl) + np.cos(rlat) * np.cos(topo_decl) * np.cos(topo_hour)))
+    if refraction:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bend = (pressure / 1010) * (283 / (273 + temperature)) * 1.02 \
+                / (60 * np.tan(np.radians(altitude + 10.3 / (altitude + 5.11))))
+        altitude = altitude + np.where(altitude >= -HORIZON_REFRACTION, bend, 0)
+    azimuth = np.degrees(np.arctan2(np.sin(topo_hour), np.cos(topo_hour) * np.sin(rlat) - np.tan(topo_decl) * np.cos(rlat)))
+    return ((azimuth + 180) % 360, altitude)
+
+#---------------#
+#   interface   #
+#---------------#
+
+ENGINES = {ENGINE_FAST: fast_angles, ENGINE_STANDARD: standard_angles, ENGINE_PRECISE: precise_angles}
+
+def engine_angles(engine, daynum, lat, long, refraction=True):
+    """[engine_angles(engine, daynum, lat, long, refraction)] is (azimuth, elevation) in degrees as float64 arrays,
+    solved by the tier [engine] (one of ENGINE_*)."""
+    azimuth, elevation = ENGINES[engine](daynum, lat, long, refraction)
+    return (np.asarray(azimuth, dtype=np.float64), np.asarray(elevation, dtype=np.float64))
+
+def engine_positions(engine, daynum, location, refraction=True):
+    """[engine_positions(engine, daynum, location, refraction)] is (azimuth, elevation, directions) like
+    [sunpos.sunpos_daynum], solved by the tier [engine]."""
+    azimuth, elevation = engine_angles(engine, daynum, location[0], location[1], refraction)
+    return (azimuth, elevation, sun_directions(azimuth, elevation))
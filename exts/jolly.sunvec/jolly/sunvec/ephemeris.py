@@ -0,0 +1,112 @@
+import os
+import struct
+import numpy as np
+from jolly.sunvec.engines import HORIZON_REFRACTION
+from jolly.sunvec.setting import CHUNK_SIZE, days_from_civil
+from jolly.sunvec.sunpos import solar_angles, sun_directions
+
+"""
+Precomputed, memory-mapped ephemeris tables of one site.
+
+A table file is a fixed header followed by [count] float32 records (azimuth, elevation, x, y, z) sampled every
+[step] seconds from the UTC epoch [start] (seconds since 2000-01-01 00:00 UTC). Tables are opened read-only with
+np.memmap, so every process reading the same file shares one copy in the OS page cache.
+
+Records hold the geometric (unrefracted) position: the refraction term of [sunpos] grows without bound towards
+-5.11 degrees, and interpolating across such a record would carry its spike above the horizon. Refraction is
+applied to the interpolated elevation instead, with the term held at its horizon value below -HORIZON_REFRACTION.
+"""
+
+HEADER = struct.Struct("<8sIIddqqq")
+HEADER_BYTES = 64
+MAGIC = b"SUNVECEP"
+VERSION = 2
+FIELDS = 5
+
+def build_table(path, lat, long, start, step, count, refraction=True, chunk=CHUNK_SIZE):
+    """[build_table(path, lat, long, start, step, count, refraction)] computes [count] geometric sun positions at
+    (lat, long) every [step] seconds from UTC epoch [start] and writes them to the table file [path]; lookups
+    are refracted if [refraction]."""
+    # Written aside under a name of this process and moved in place, so builders never truncate each other's file.
+    partial = F"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, int(bool(refraction)), lat, long, start, step, count).ljust(HEADER_BYTES, b"\0"))
+        f.truncate(HEADER_BYTES + count * FIELDS * 4)
+    records = np.memmap(partial, dtype=np.float32, mode="r+", offset=HEADER_BYTES, shape=(count, FIELDS))
+    for first in range(0, count, chunk):
+        last = min(first + chunk, count)
+        daynum = (start + step * np.arange(first, last, dtype=np.int64)) / 86400 - 0.5
+        azimuth, elevation = solar_angles(daynum, lat, long, False)
+        records[first:last, 0] = azimuth
+        records[first:last, 1] = elevation
+        records[first:last, 2:] = sun_directions(azimuth, elevation)
+    records.flush()
+    del records
+    os.replace(partial, path)
+    return EphemerisTable(path)
+
+def site_table(directory, lat, long, year, step=60, refraction=True):
+    """[site_table(directory, lat, long, year, step, refraction)] is the table of (lat, long) covering [year]
+    (plus a day either side for timezones) at [step] seconds, built in [directory] the first time it is asked for."""
+    name = F"sunvec_{lat:.6f}_{long:.6f}_{year}_{step}s{'_refr' if refraction else ''}_v{VERSION}.ephem"
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        return EphemerisTable(path)
+    os.makedirs(directory, exist_ok=True)
+    start = (days_from_civil(year, 1, 1) - 1) * 86400
+    end = (days_from_civil(year + 1, 1, 1) + 1) * 86400
+    return build_table(path, lat, long, start, step, (end - start) // step + 1, refraction)
+
+
+class EphemerisTable():
+    """
+    [EphemerisTable(path)] is a read-only view of the table file at [path] (see [build_table]).
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, refraction, lat, long, start, step, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(F"JOLLY.SUNVEC..{path} is not a version {VERSION} ephemeris table")
+        self.path = path
+        self.refraction = bool(refraction)
+        self.loc = (lat, long)
+        self.start = start
+        self.step = step
+        self.count = count
+        self.records = np.memmap(path, dtype=np.float32, mode="r", offset=HEADER_BYTES, shape=(count, FIELDS))
+
+    def __len__(self):
+        return self.count
+
+    def end(self):
+        return self.start + self.step * (self.count - 1)
+
+    def covers(self, utc_epochs):
+        """[covers(utc_epochs)] is True if every UTC epoch lies within the table."""
+        utc_epochs = np.asarray(utc_epochs)
+        return len(utc_epochs) == 0 or (self.start <= utc_epochs.min() and utc_epochs.max() <= self.end())
+
+    def lookup(self, utc_epochs):
+        """[lookup(utc_epochs)] is (azimuth, elevation, directions) like [sunpos.sunpos_daynum], linearly
+        interpolated between the two nearest records and then refracted; epochs must be covered by the table."""
+        position = (np.asarray(utc_epochs, dtype=np.float64) - self.start) / self.step
+        index = np.clip(np.floor(position).astype(np.int64), 0, self.count - 2)
+        weight = (position - index)[:, None]
+        directions = (1 - weight) * self.records[index, 2:] + weight * self.records[index + 1, 2:]
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        azimuth = np.degrees(np.arctan2(directions[:, 0], directions[:, 1])) % 360
+        elevation = np.degrees(np.arcsin(np.clip(directions[:, 2], -1, 1)))
+        if self.refraction:
+            elevation = elevation + refraction_term(elevation)
+            directions = sun_directions(azimuth, elevation)
+        return (azimuth, elevation, directions)
+
+    def positions(self, settings):
+        """[positions(settings)] is [lookup] for every instant of the SettingArray [settings]."""
+        return self.lookup(settings.utc_epochs())
+
+def refraction_term(elevation):
+    """[refraction_term(elevation)] is the refraction of [sunpos] in degrees for geometric [elevation] degrees,
+    held at its value at -HORIZON_REFRACTION below that instead of diverging towards -5.11."""
+    elevation = np.maximum(elevation, -HORIZON_REFRACTION)
+    return (1.02 / np.tan(np.radians(elevation + 10.3 / (elevation + 5.11)))) / 60
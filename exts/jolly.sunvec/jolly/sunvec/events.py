@@ -0,0 +1,101 @@
+from math import pi
+import numpy as np
+from jolly.sunvec.setting import Setting, SettingArray, days_from_civil
+from jolly.sunvec.sunpos import ecliptic_longitude, equatorial
+
+"""
+Solar events on the [sunpos] model: solar noon, sunrise/sunset and other elevation crossings, and the
+solstices/equinoxes. Each event starts from its closed-form hour-angle (or ecliptic-longitude) solution and is
+polished by a few Newton iterations, so a day costs a handful of evaluations instead of dense sampling.
+
+Times are UTC days from J2000 (the [daynum] of sunpos); [settings_of] turns them into local Settings.
+"""
+
+# Geometric elevation of the sun's center when its upper limb touches a refracted horizon.
+SUNRISE_ELEVATION = -0.833
+# Rate of the sun's hour angle in radians per day.
+HOUR_ANGLE_RATE = 6.300388099 - 0.01720279239
+# Ecliptic longitudes of the seasons in radians.
+SEASONS = {"march equinox": 0, "june solstice": pi/2, "september equinox": pi, "december solstice": 3*pi/2}
+# Rough day of year (from Jan 1) of each season, used as the first guess.
+SEASON_GUESS = {"march equinox": 79, "june solstice": 171, "september equinox": 265, "december solstice": 354}
+
+def wrap(angle):
+    """[wrap(angle)] is [angle] moved into [-pi, pi)."""
+    return (angle + pi) % (2*pi) - pi
+
+def local_days(first_setting, last_setting):
+    """[local_days(first_setting, last_setting)] is the day number (see setting.days_from_civil) of every local
+    calendar date from [first_setting] through [last_setting]."""
+    return np.arange(first_setting.epoch // 86400, last_setting.epoch // 86400 + 1)
+
+def solar_noon(days, long, timezone, iterations=3):
+    """[solar_noon(days, long, timezone)] is the UTC daynum of the sun's upper transit on every local day in [days]."""
+    daynum = np.asarray(days, dtype=np.float64) - timezone / 24  # Local noon as the first guess.
+    for _ in range(iterations):
+        _, hour_ang = equatorial(daynum, long)
+        daynum = daynum - wrap(hour_ang) / HOUR_ANGLE_RATE
+    return daynum
+
+def elevation_crossings(days, lat, long, timezone, elevation=SUNRISE_ELEVATION, iterations=3):
+    """[elevation_crossings(days, lat, long, timezone, elevation)] is (rising, setting): the UTC daynums at which
+    the sun's geometric elevation passes [elevation] degrees on every local day in [days]; NaN on days the sun
+    stays above or below it."""
+    rlat = np.radians(lat)
+    target = np.radians(elevation)
+    noon = solar_noon(days, long, timezone)
+
+    def elevation_at(daynum):
+        decl, hour_ang = equatorial(daynum, long)
+        sin_elevation = np.sin(decl) * np.sin(rlat) + np.cos(decl) * np.cos(rlat) * np.cos(hour_ang)
+        return np.arcsin(np.clip(sin_elevation, -1, 1)), decl, hour_ang
+
+    # Closed form: half the day arc from the declination at noon.
+    decl, _ = equatorial(noon, long)
+    cos_arc = (np.sin(target) - np.sin(rlat) * np.sin(decl)) / (np.cos(rlat) * np.cos(decl))
+    with np.errstate(invalid="ignore"):
+        arc = np.where(np.abs(cos_arc) <= 1, np.arccos(np.clip(cos_arc, -1, 1)), np.nan)
+
+    crossings = []
+    for sign in (-1, 1):
+        daynum = noon + sign * arc / HOUR_ANGLE_RATE
+        for _ in range(iterations):
+            current, decl, hour_ang = elevation_at(daynum)
+            slope = -np.cos(decl) * np.cos(rlat) * np.sin(hour_ang) * HOUR_ANGLE_RATE / np.maximum(np.cos(current), 1e-9)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                daynum = daynum - np.where(np.abs(slope) > 1e-9, (current - target) / slope, 0)
+        crossings.append(daynum)
+    return (crossings[0], crossings[1])
+
+def seasons(year, iterations=4):
+    """[seasons(year)] is a dict of the UTC daynums of the equinoxes and solstices of [year], by name."""
+    events = {}
+    for name, target in SEASONS.items():
+        daynum = days_from_civil(year, 1, 1) + SEASON_GUESS[name] - 0.5
+        for _ in range(iterations):
+            mean_anom = daynum * 0.01720197034 + 6.240040768
+            rate = 0.01720279239 + 0.01720197034 * (0.03342305518 * np.cos(mean_anom) \
+                + 2 * 0.0003490658504 * np.cos(2 * mean_anom))
+            daynum = daynum - wrap(ecliptic_longitude(daynum) - target) / rate
+        events[name] = float(daynum)
+    return events
+
+def settings_of(daynums, lat, long, timezone):
+    """[settings_of(daynums, lat, long, timezone)] is the SettingArray (rounded to the second, local clock time)
+    of the finite UTC daynums in [daynums]."""
+    daynums = np.asarray(daynums, dtype=np.float64)
+    daynums = daynums[np.isfinite(daynums)]
+    return SettingArray(lat, long, np.round((daynums + 0.5) * 86400 + timezone * 3600).astype(np.int64), timezone)
+
+def daily_events(first_setting: Setting, last_setting: Setting, elevation=SUNRISE_ELEVATION):
+    """[daily_events(first_setting, last_setting, elevation)] is a dict of SettingArrays of the sunrise, solar noon
+    and sunset (crossings of [elevation]) of every local day between the two Settings, at the first one's place;
+    days without a sunrise or sunset are left out of that array."""
+    lat, long, timezone = first_setting.lat, first_setting.long, first_setting.timezone
+    days = local_days(first_setting, last_setting)
+    rising, setting = elevation_crossings(days, lat, long, timezone, elevation)
+    return {
+        "sunrise": settings_of(rising, lat, long, timezone),
+        "noon": settings_of(solar_noon(days, long, timezone), lat, long, timezone),
+        "sunset": settings_of(setting, lat, long, timezone),
+    }
@@ -1,15 +1,33 @@
 from math import pi
-from jolly.sunvec.setting import Setting, SettingRange, Timespan
+from jolly.sunvec.setting import Setting, SettingArray, SettingRange, Timespan
 from jolly.sunvec.spectrum import *
-from jolly.sunvec.sunpos import sunpos
+from jolly.sunvec.cache import SunposCache
+from jolly.sunvec.cluster import collapse
+from jolly.sunvec.engines import ENGINE_NAMES, ENGINE_PRECISE, ENGINE_STANDARD
+from jolly.sunvec.ephemeris import site_table
+from jolly.sunvec.events import daily_events, seasons, settings_of
+from jolly.sunvec.profiling import PROFILER
+from jolly.sunvec.sampling import adaptive_array
+from jolly.sunvec.skybake import DOME_ROTATION, bake_sky, remove_skies
+from jolly.sunvec.sunpath import sun_path_curves
+from jolly.sunvec.scheduler import CancelToken, RebuildScheduler
 from jolly.sunvec.cmds_common import *
+from jolly.sunvec.usd_common import AuthorAnimatedSunCommand, AuthorCurvesCommand, AuthorDomeCommand, \
+    AuthorPointsCommand, AuthorSunsCommand, attach_layer, author_animated_sun, author_curves, author_dome, author_points, \
+    author_suns, detach_layer, export_layer, matching_suns, present_prims, write_time_range
 from jolly.sunvec.ui_common import *
 from jolly.sunvec.util import *
 import omni.ext
 import omni.ui as ui
+import omni.kit.app
 import omni.kit.commands
+import omni.timeline
 import omni.usd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import os
+import tempfile
+import numpy as np
 
 # NOTE: +Z is the vertical direction; this is not Omniverse's default.
 # TODO: Add a +Axis toggle.
@@ -22,7 +40,20 @@ from datetime import datetime
 MODE_SUBDIVIDE = 0
 MODE_STEP = 1
 MODE_STEP_UNTIL = 2
+MODE_ADAPTIVE = 3  # Samples are spaced by angle on the sky instead of by time.
 
+# Anchors
+ANCHOR_MANUAL = 0  # The range runs between the start and end dates.
+ANCHOR_DAYLIGHT = 1  # The range runs from sunrise to sunset of the start date.
+ANCHOR_SOLSTICES = 2  # The range runs from the June to the December solstice of the start year.
+
+# Visualizations
+VIS_LIGHTS = 0  # One DistantLight per sample.
+VIS_MARKERS = 1  # One Points prim with a marker per sample on the sky sphere.
+VIS_ANIMATED = 2  # One DistantLight time-sampled at every sample, played back on the timeline.
+VIS_SKY = 3  # One DomeLight lit by a lat-long HDR texture with every sample baked into it.
+
+SKY_WIDTHS = (512, 1024, 2048, 4096)  # Baked sky texture widths offered in the UI.
 
 
 class SunVec(omni.ext.IExt):
@@ -79,6 +110,57 @@ class SunVec(omni.ext.IExt):
     # Default Light Params
     intensity = 100
 
+    # Authoring Params
+    bulk_authoring = True  # Write all suns in one Sdf change block instead of four kit commands per sun.
+    undoable_authoring = True  # Record a bulk write as a single undo entry.
+
+    # Solar Position Cache Params
+    cache_bytes = 16 * 2**20  # Memory cap of [self.sunpos_cache], created in [on_startup].
+
+    # Solar Model Params (see engines.py)
+    engine = ENGINE_STANDARD  # Solves every rebuild triggered by the forms.
+    bake_engine = ENGINE_PRECISE  # Solves "Place Suns", the final placement.
+
+    # Ephemeris Table Params
+    ephemeris_dir = None  # Directory of per-site ephemeris tables; None computes every position instead.
+    ephemeris_step = 60  # Seconds between table records.
+    ephemeris_key = None  # (location, year) of [self.ephemeris_table], the one table kept open.
+    ephemeris_table = None
+
+    # Adaptive Sampling Params
+    adaptive_spacing = 5.0  # Degrees between neighbouring suns.
+    adaptive_limit = 1001  # Most lights placed in MODE_ADAPTIVE; refinement stops early to stay under it.
+
+    # Clustering Params
+    cluster_count = 0  # Collapse every sample into this many representative lights; 0 places one light per sample.
+
+    # Layer Export Params
+    export_toggle = False  # Write suns into [self.export_path], attached as a sublayer, instead of the edit layer.
+    export_path = os.path.join(tempfile.gettempdir(), "jolly.sunvec", "sunvec_suns.usdc")
+    profile_path = os.path.join(tempfile.gettempdir(), "jolly.sunvec", "sunvec_profile.json")
+
+    # Animated Sun Params
+    animated_name = "sunAnimated"
+    animation_frames = 240  # Timecodes the whole range is played over.
+    animation_limit = 10000  # Most time samples written; longer ranges are thinned evenly.
+
+    # Baked Sky Params
+    dome_name = "sunSky"
+    sky_width = 1024  # Texture width in pixels; the lat-long image is half as tall.
+    sky_kernel = 1.0  # Degrees across the glow of each sun (full width at half maximum).
+    sky_dir = os.path.join(tempfile.gettempdir(), "jolly.sunvec")  # Baked textures are kept here and reused.
+    sky_keep = 2  # Textures shown this session that stay on disk: the current one and the one before it, for undo.
+    sky_textures = ()  # Textures shown this session, oldest first; older ones are deleted, the rest on shutdown.
+
+    # Sun-Path Marker Params
+    marker_name = "sunPath"
+    sky_radius = 1000.0  # Distance of the markers from the origin.
+    marker_width = 10.0
+
+    # Sun-Path Diagram Params
+    diagram_names = {"analemmas": "sunPathAnalemmas", "seasons": "sunPathSeasons", "months": "sunPathMonths"}
+    diagram_width = 4.0
+
     #-------------------#
     #   accessibility   #
     #-------------------#
@@ -98,7 +180,8 @@ class SunVec(omni.ext.IExt):
     vg_subdivide = Visibles("subdivide", default=True)
     vg_step = Visibles("step", default=False)
     vg_step_until = Visibles("step until", default=False)
-    visibles.register_groups(vg_subdivide, vg_step, vg_step_until)
+    vg_adaptive = Visibles("adaptive", default=False)
+    visibles.register_groups(vg_subdivide, vg_step, vg_step_until, vg_adaptive)
 
     #-----------#
     #   modes   #
@@ -106,6 +189,8 @@ class SunVec(omni.ext.IExt):
 
     # Default Mode
     mode = MODE_SUBDIVIDE
+    anchor = ANCHOR_MANUAL
+    visualization = VIS_LIGHTS
 
     def mode_subdivide(self):
         self.mode = MODE_SUBDIVIDE
@@ -119,47 +204,338 @@ class SunVec(omni.ext.IExt):
         self.mode = MODE_STEP_UNTIL
         self.visibles.island_enable(self.vg_step_until)
 
+    def mode_adaptive(self):
+        self.mode = MODE_ADAPTIVE
+        self.visibles.island_enable(self.vg_adaptive)
+
     #--------------------#
     #   helper methods   #
     #--------------------#
 
+    # Registry of the suns currently in the scene, name -> (rotation, color, intensity).
+    live_suns = {}
+
     def cleanup(self):
         """[cleanup()] clears the content folder given by [omniverse_directory]."""
-        delete(self.extension_dump[0:len(self.extension_dump)-1])
-
-    def birth_sun(self, name, sunvector_sph, color=(1,1,1)):
-        """[birth_sun(name, sunvector_sph, color=(1,1,1)] creates a sun in the direction of [sunvector_sph] 
-        with the emission color [color]; the primitive is named [name] and put in the directory [self.extension_dump]."""
+        with PROFILER.span("cleanup"):
+            delete(self.extension_dump[0:len(self.extension_dump)-1])
+            self.live_suns = {}
+
+    def sync_suns(self, suns, removals=()):
+        """[sync_suns(suns, removals)] brings the scene to [suns], a dict name -> (rotation, color, intensity);
+        only attributes that differ from [self.live_suns] are written and only extra suns are removed,
+        along with any other prims named in [removals]."""
+        # Forget suns that were deleted or changed behind our back (e.g. by the user, an undo or a new stage);
+        # they are written again in full. Removals only need the prim to exist.
+        present = present_prims(self.extension_dump, self.live_suns)
+        matching = matching_suns(self.extension_dump, {name: self.live_suns[name] for name in present})
+        live = {name: sun for name, sun in self.live_suns.items() if name in matching}
+        stale = [name for name in present if name not in matching and name not in suns]
+
+        changes = {}
+        for name, sun in suns.items():
+            old = live.get(name)
+            if old is None:
+                changes[name] = sun
+            elif old != sun:
+                changes[name] = tuple(new if new != prev else None for new, prev in zip(sun, old))
+        removals = [name for name in live if name not in suns] + stale + list(removals)
+
+        if changes or removals:
+            author_suns(self.extension_dump, changes, removals, undoable=self.undoable_authoring)
+        self.live_suns = dict(suns)
+
+    def birth_sun(self, name, sunvector_sph, color=(1,1,1), intensity=None):
+        """[birth_sun(name, sunvector_sph, color=(1,1,1), intensity)] creates a sun in the direction of [sunvector_sph] 
+        with the emission color [color] and [intensity] ([self.intensity] if None); the primitive is named [name] and
+        put in the directory [self.extension_dump]."""
         create_distant_light(self.extension_dump, name)
         color_distant_light(self.extension_dump, name, color)
-        intensity_distant_light(self.extension_dump, name, self.intensity)
+        intensity_distant_light(self.extension_dump, name, self.intensity if intensity is None else intensity)
         orient_distant_light(self.extension_dump, name, sunvector_sph)
 
-    def sun_vector(self, setting: Setting):
-        """[sun_vector(setting)] is a tuple (azimuth, phi) which designates the sun location in the sky for the time and location of [setting]."""
-        azimuth, elevation = sunpos(setting.get_date(), setting.get_loc(), True)
+    def sun_vector(self, setting: Setting, engine=None):
+        """[sun_vector(setting, engine)] is a tuple (azimuth, phi) which designates the sun location in the sky for the time and location of [setting];
+        solved by the tier [engine], [self.engine] if None."""
+        azimuth, elevation = self.sunpos_cache.sunpos(setting, True, self.engine if engine is None else engine)
         azimuth = rad(azimuth)
         elevation = rad(elevation)
         return(azimuth, pi/2 - elevation)
     
-    def position_suns(self):
-        """[position_suns] places suns in the scene according to the mode and user params."""
+    def anchored_range(self):
+        """[anchored_range()] is the SettingRange the modes sample: the start and end dates, or the solar events
+        chosen by [self.anchor]; falls back to the start and end dates when the event does not happen (polar days)."""
+        start = self.setting_start
+        if self.anchor == ANCHOR_DAYLIGHT:
+            events = daily_events(start, start)
+            if len(events["sunrise"]) and len(events["sunset"]):
+                return SettingRange(events["sunrise"][0], events["sunset"][0])
+        elif self.anchor == ANCHOR_SOLSTICES:
+            year = seasons(start.year)
+            solstices = settings_of([year["june solstice"], year["december solstice"]], start.lat, start.long, start.timezone)
+            return SettingRange(solstices[0], solstices[1])
+        return SettingRange(self.setting_start, self.setting_end)
+
+    def sample_chunks(self):
+        """[sample_chunks()] is a generator of SettingArrays covering the current mode's samples without the
+        Step Until cap; for consumers that do not place one light per sample."""
+        setting_range = self.anchored_range()
         if self.mode == MODE_SUBDIVIDE:
-            sets = SettingRange(self.setting_start, self.setting_end).subdiv_range(self.inc_steps)
+            return setting_range.subdiv_chunks(self.inc_steps)
         elif self.mode == MODE_STEP:
-            sets = SettingRange(self.setting_start, self.setting_end).increment_range(self.increment, self.inc_steps)
+            return setting_range.increment_chunks(self.increment, self.inc_steps)
         elif self.mode == MODE_STEP_UNTIL:
-            sets = SettingRange(self.setting_start, self.setting_end).increment_until_range(self.increment)
+            return setting_range.increment_until_chunks(self.increment)
+        elif self.mode == MODE_ADAPTIVE:
+            return iter([adaptive_array(setting_range, self.adaptive_spacing)])
+
+    def positions(self, sets, engine=None):
+        """[positions(sets, engine)] is (azimuth, elevation, directions) for every instant of the SettingArray [sets],
+        solved by the tier [engine] ([self.engine] if None); read from the site's memory-mapped ephemeris table when
+        [self.ephemeris_dir] is set, it covers them and the tier is the standard one the tables are built with."""
+        PROFILER.count("samples", len(sets))
+        with PROFILER.span("sunpos"):
+            engine = self.engine if engine is None else engine
+            if self.ephemeris_dir is not None and len(sets) and engine == ENGINE_STANDARD:
+                year = sets[0].year
+                key = (sets.get_loc(), year)
+                if key != self.ephemeris_key:
+                    # Tables of other sites or years are dropped, so at most one stays mapped.
+                    self.ephemeris_key, self.ephemeris_table = None, None
+                    self.ephemeris_table = site_table(self.ephemeris_dir, sets.lat, sets.long, year, self.ephemeris_step)
+                    self.ephemeris_key = key
+                table = self.ephemeris_table
+                if table.covers(sets.utc_epochs()):
+                    return table.positions(sets)
+            return self.sunpos_cache.positions(sets, True, engine)
+
+    def colors(self, count):
+        """[colors(count)] is the emission color of each of [count] suns, as (count, 3) rows."""
+        with PROFILER.span("colors"):
+            if not(self.color_toggle):
+                return np.ones((count, 3))
+            return ring_palette(count, self.color_mode)[1:]
+
+    def position_suns(self, engine=None):
+        """[position_suns(engine)] places suns in the scene according to the mode, visualization and user params."""
+        self.author_plan(self.plan_suns(engine=engine))
+
+    def plan_suns(self, token=None, engine=None):
+        """[plan_suns(token, engine)] computes everything [position_suns] places without touching the stage, so it may
+        run off the UI thread; it stops with RebuildCancelled once [token] is cancelled. Positions are solved by
+        the tier [engine], [self.engine] if None."""
+        token = token if token is not None else CancelToken()
+        engine = self.engine if engine is None else engine
+        with PROFILER.span("plan"):
+            if self.visualization == VIS_MARKERS:
+                return self.plan_markers(token, engine)
+            elif self.visualization == VIS_ANIMATED:
+                return self.plan_animated(token, engine)
+            elif self.visualization == VIS_SKY:
+                return self.plan_sky(token, engine)
+            else:
+                return self.plan_lights(token, engine)
+
+    def author_plan(self, plan):
+        """[author_plan(plan)] writes a plan made by [plan_suns] to the stage; must run on the UI thread."""
+        with PROFILER.span("author"):
+            if self.export_toggle:
+                self.export_plan(plan)
+            elif plan["visualization"] == VIS_MARKERS:
+                self.position_markers(plan)
+            elif plan["visualization"] == VIS_ANIMATED:
+                self.position_animated(plan)
+            elif plan["visualization"] == VIS_SKY:
+                self.position_sky(plan)
+            else:
+                self.position_lights(plan)
+
+    def export_plan(self, plan):
+        """[export_plan(plan)] writes a plan made by [plan_suns] into the layer file [self.export_path] and attaches
+        it to the stage; the suns in the edit layer are removed so the scene file stays small."""
+        self.sync_suns({}, present_prims(self.extension_dump, [self.marker_name, self.animated_name, self.dome_name]))
+        if plan["visualization"] == VIS_MARKERS:
+            export_layer(self.export_path, self.extension_dump, \
+                markers=(self.marker_name, plan["points"], plan["colors"], self.marker_width))
+        elif plan["visualization"] == VIS_ANIMATED and not len(plan["timecodes"]):
+            export_layer(self.export_path, self.extension_dump)
+        elif plan["visualization"] == VIS_ANIMATED:
+            export_layer(self.export_path, self.extension_dump, animation=(self.animated_name, plan["timecodes"], \
+                plan["rotations"], plan["colors"], plan["intensities"]))
+            self.play_range(plan["timecodes"])
+        elif plan["visualization"] == VIS_SKY:
+            # The layer file outlives the session, so its texture is never deleted.
+            self.sky_textures = tuple(texture for texture in self.sky_textures if texture != plan["texture"])
+            export_layer(self.export_path, self.extension_dump, \
+                dome=(self.dome_name, plan["texture"], self.intensity, DOME_ROTATION))
+        else:
+            export_layer(self.export_path, self.extension_dump, plan["suns"])
+        attach_layer(self.export_path)
+
+    def sample_directions(self, token, engine=None):
+        """[sample_directions(token)] is the (N, 3) unit vector toward the sun of every sample of the current mode."""
+        directions = []
+        for sets in self.sample_chunks():
+            token.check()
+            directions.append(self.positions(sets, engine)[2])
+        return np.concatenate(directions) if directions else np.empty((0, 3))
+
+    def plan_markers(self, token, engine=None):
+        """[plan_markers(token)] is the marker positions on the sky sphere and colors of every sample of the current mode."""
+        points = self.sample_directions(token, engine).astype(np.float32) * self.sky_radius
+        return {"visualization": VIS_MARKERS, "points": points, "colors": self.colors(len(points))}
+
+    def position_markers(self, plan):
+        """[position_markers(plan)] draws every sample of the current mode as one marker cloud on the sky sphere."""
+        if self.bulk_authoring:
+            self.sync_suns({}, present_prims(self.extension_dump, [self.animated_name, self.dome_name]))
+        author_points(self.extension_dump, self.marker_name, plan["points"], plan["colors"], \
+            self.marker_width, undoable=self.undoable_authoring)
+
+    def plan_animated(self, token, engine=None):
+        """[plan_animated(token)] is the timecode, rotation, color and intensity of the one animated sun at every
+        sample of the current mode; timecodes follow the samples' clock times across [self.animation_frames]."""
+        with PROFILER.span("range"):
+            sets = SettingArray.concatenate(self.sample_chunks(), self.anchored_range().location())
+            if len(sets) > self.animation_limit:
+                print(F"JOLLY.SUNVEC..{len(sets)} samples is too many to animate, keeping {self.animation_limit}")
+                sets = sets[np.linspace(0, len(sets) - 1, self.animation_limit).round().astype(np.int64)]
+        if not len(sets):
+            return {"visualization": VIS_ANIMATED, "timecodes": np.empty(0), "rotations": np.empty((0, 3)), \
+                "colors": np.empty((0, 3)), "intensities": np.empty(0)}
+        azimuths, elevations, _ = self.positions(sets, engine)
+        token.check()
+
+        span = max(int(sets.epochs[-1] - sets.epochs[0]), 1)
+        timecodes = (sets.epochs - sets.epochs[0]) / span * self.animation_frames
+        # Same rotation as [theta_phi_to_spherical]; azimuth is unwrapped so playback never spins the long way round.
+        rotations = np.stack((elevations - 90, np.zeros(len(sets)), -np.degrees(np.unwrap(np.radians(azimuths)))), axis=1)
+        # The sun goes out below the horizon rather than lighting the scene from underneath.
+        intensities = np.where(elevations > 0, float(self.intensity), 0.0)
+        return {"visualization": VIS_ANIMATED, "timecodes": timecodes, "rotations": rotations, \
+            "colors": self.colors(len(sets)), "intensities": intensities}
+
+    def position_animated(self, plan):
+        """[position_animated(plan)] places the one time-sampled sun and fits the timeline to its samples; with
+        nothing sampled there is no sun to animate."""
+        if not len(plan["timecodes"]):
+            self.sync_suns({}, present_prims(self.extension_dump, [self.marker_name, self.dome_name, self.animated_name]))
+            return
+        if self.bulk_authoring:
+            self.sync_suns({}, present_prims(self.extension_dump, [self.marker_name, self.dome_name]))
+        author_animated_sun(self.extension_dump, self.animated_name, plan["timecodes"], plan["rotations"], \
+            plan["colors"], plan["intensities"], undoable=self.undoable_authoring)
+        self.play_range(plan["timecodes"])
+
+    def plan_sky(self, token, engine=None):
+        """[plan_sky(token)] is the path of the sky texture with every sample of the current mode baked into it
+        (see skybake.py); suns below the horizon add darkness to the average rather than light from underneath."""
+        directions = self.sample_directions(token, engine)
+        token.check()
+        colors = self.colors(len(directions)) * (directions[:, 2] > 0)[:, None]
+        return {"visualization": VIS_SKY, "texture": bake_sky(directions, colors, self.sky_dir, self.sky_width, self.sky_kernel)}
+
+    def position_sky(self, plan):
+        """[position_sky(plan)] places the one DomeLight lit by the baked sky texture."""
+        if self.bulk_authoring:
+            self.sync_suns({}, present_prims(self.extension_dump, [self.marker_name, self.animated_name]))
+        author_dome(self.extension_dump, self.dome_name, plan["texture"], self.intensity, DOME_ROTATION, \
+            undoable=self.undoable_authoring)
+        self.keep_sky(plan["texture"])
+
+    def keep_sky(self, path):
+        """[keep_sky(path)] records that the DomeLight shows the texture [path] and deletes the textures shown
+        before it beyond the last [self.sky_keep]."""
+        shown = tuple(texture for texture in self.sky_textures if texture != path) + (path,)
+        remove_skies(shown[:-self.sky_keep])
+        self.sky_textures = shown[-self.sky_keep:]
+
+    def plan_diagram(self, token=None, engine=None):
+        """[plan_diagram(token, engine)] is the sun-path diagram of the start date's year at the current site (see
+        sunpath.py) on the sky sphere, as one group of curves per prim in [self.diagram_names], colored by hour, season
+        or month; like [plan_suns] it does not touch the stage and stops once [token] is cancelled."""
+        token = token if token is not None else CancelToken()
+        curves = {}
+        groups = sun_path_curves(self.lat, self.long, self.timezone, self.setting_start.year, \
+            engine=self.engine if engine is None else engine)
+        token.check()
+        for group, (points, counts, curve) in groups.items():
+            palette = ring_palette({"analemmas": 24, "seasons": 4, "months": 12}[group], self.color_mode)[1:]
+            curves[self.diagram_names[group]] = (points * self.sky_radius, counts, palette[curve], self.diagram_width)
+        return curves
+
+    def draw_diagram(self, curves=None):
+        """[draw_diagram(curves)] places the sun-path diagram [curves] made by [plan_diagram], or planned right away
+        if None, as a few BasisCurves prims next to the suns; must run on the UI thread."""
+        with PROFILER.span("diagram"):
+            if curves is None:
+                curves = self.plan_diagram()
+            author_curves(self.extension_dump, curves, undoable=self.undoable_authoring)
+
+    def play_range(self, timecodes):
+        """[play_range(timecodes)] sets the stage's and the timeline's playback range to span [timecodes]."""
+        write_time_range(omni.usd.get_context().get_stage().GetRootLayer(), timecodes[0], timecodes[-1])
+        timeline = omni.timeline.get_timeline_interface()
+        per_second = timeline.get_time_codes_per_seconds()
+        timeline.set_start_time(float(timecodes[0]) / per_second)
+        timeline.set_end_time(float(timecodes[-1]) / per_second)
+
+    def plan_clustered_lights(self, token, engine=None):
+        """[plan_clustered_lights(token)] is [self.cluster_count] DistantLights standing in for every sample of the
+        current mode, each with the summed intensity and mean color of the samples it represents."""
+        directions = self.sample_directions(token, engine)
+        token.check()
+        if not len(directions):
+            return {"visualization": VIS_LIGHTS, "suns": {}}
+        with PROFILER.span("cluster"):
+            centers, colors, intensities = collapse(directions, self.colors(len(directions)), self.intensity, self.cluster_count)
+
+        suns = {}
+        i = 0
+        for center, color, intensity in zip(centers, colors, intensities):
+            i+=1
+            theta, phi = xyz_to_theta_phi(*center)
+            suns[F"sunVector{i}"] = (theta_phi_to_spherical(theta, phi), tuple(color), float(intensity))
+        return {"visualization": VIS_LIGHTS, "suns": suns}
+
+    def plan_lights(self, token, engine=None):
+        """[plan_lights(token)] is the name, rotation, color and intensity of one DistantLight per sample of the current mode."""
+        if self.cluster_count > 0:
+            return self.plan_clustered_lights(token, engine)
+        with PROFILER.span("range"):
+            setting_range = self.anchored_range()
+            if self.mode == MODE_SUBDIVIDE:
+                sets = setting_range.subdiv_array(self.inc_steps)
+            elif self.mode == MODE_STEP:
+                sets = setting_range.increment_array(self.increment, self.inc_steps)
+            elif self.mode == MODE_STEP_UNTIL:
+                sets = setting_range.increment_until_array(self.increment)
+            elif self.mode == MODE_ADAPTIVE:
+                sets = adaptive_array(setting_range, self.adaptive_spacing, limit=self.adaptive_limit)
         
+        # Solve every sun in one pass; (theta, phi) as in [sun_vector].
+        azimuths, elevations, _ = self.positions(sets, engine)
+        thetas = rad(azimuths)
+        phis = pi/2 - rad(elevations)
+        token.check()
+
+        colors = self.colors(len(sets))
+
+        suns = {}
         i = 0
-        for setting in sets:
+        for theta, phi in zip(thetas, phis):
             i+=1
-            theta, phi = self.sun_vector(setting)
-            sun_vector = theta_phi_to_spherical(theta, phi)
-            if self.color_toggle:
-                self.birth_sun(F"sunVector{i}", sun_vector, RingColor(Spectrum(sets), self.color_mode).color(i))
-            else: 
-                self.birth_sun(F"sunVector{i}", sun_vector)
+            suns[F"sunVector{i}"] = (theta_phi_to_spherical(theta, phi), tuple(colors[i-1]), self.intensity)
+        return {"visualization": VIS_LIGHTS, "suns": suns}
+
+    def position_lights(self, plan):
+        """[position_lights(plan)] places one DistantLight per sample of the current mode."""
+        if self.bulk_authoring:
+            self.sync_suns(plan["suns"], present_prims(self.extension_dump, \
+                [self.marker_name, self.animated_name, self.dome_name]))
+        else:
+            for name, (sun_vector, color, intensity) in plan["suns"].items():
+                self.birth_sun(name, sun_vector, color, intensity)
 
     #---------------------#
     #   events/triggers   #
@@ -169,9 +545,29 @@ class SunVec(omni.ext.IExt):
 
     def stimulate(self):
         """[stimulate()] is the main extension method; it places suns wherever the user has specified.
-        NOTE: This should be called after any update to the conditions."""
-        self.cleanup()
-        self.position_suns()
+        NOTE: This should be called after any update to the conditions; calls made within the same UI frame
+        are coalesced by [self.scheduler] into one [rebuild()]. A pending "Place Suns" is cancelled, since its
+        plan would read the params while they are being edited; so is a pending diagram."""
+        for scheduler, action in ((self.bake_scheduler, "Place Suns"), (self.diagram_scheduler, "Draw Sun-Path Diagram")):
+            if scheduler.dirty():
+                print(F"JOLLY.SUNVEC..\"{action}\" cancelled by an edit")
+                scheduler.cancel()
+        self.scheduler.request()
+
+    def place_suns(self):
+        """[place_suns()] places suns solved by [self.bake_engine] off the UI thread, in place of any pending preview."""
+        self.scheduler.cancel()
+        self.bake_scheduler.request()
+
+    def rebuild(self, plan=None):
+        """[rebuild(plan)] brings the scene up to date with [plan], or with the user params right away if None."""
+        with PROFILER.span("rebuild"):
+            if plan is None:
+                plan = self.plan_suns()
+            if not(self.bulk_authoring):
+                self.cleanup()
+            self.author_plan(plan)
+        self.refresh_stats()
 
     def write_defaults(self): 
         """[write_defaults] sets all user forms to their default values."""
@@ -191,6 +587,23 @@ class SunVec(omni.ext.IExt):
         # Write Increment Steps Default
         write(self.is_inc_steps, self.inc_steps)
 
+        # Write Solar Model Defaults
+        self.cmbx_engine.model.get_item_value_model().set_value(self.engine)
+        self.cmbx_bake_engine.model.get_item_value_model().set_value(self.bake_engine)
+
+        # Write Solar Position Cache Default
+        write(self.is_cache_mib, self.cache_bytes // 2**20)
+
+        # Write Export Layer Default
+        write(self.sf_export_path, self.export_path)
+
+        # Write Angular Spacing Default
+        write(self.ff_adaptive_spacing, self.adaptive_spacing)
+
+        # Write Baked Sky Defaults
+        self.cmbx_sky_width.model.get_item_value_model().set_value(SKY_WIDTHS.index(self.sky_width))
+        write(self.ff_sky_kernel, self.sky_kernel)
+
         # Write Starting Date Defaults
         write(self.is_start_year, self.start_year)
         write(self.is_start_month, self.start_month)
@@ -283,6 +696,122 @@ class SunVec(omni.ext.IExt):
 
         self.stimulate()
 
+    def anchor_changed(self, dummyA=None, dummyB=None):
+        """[anchor_changed] anchors the sampled range on the solar events chosen in [cmbx_anchor]."""
+        self.anchor = self.cmbx_anchor.model.get_item_value_model().as_int
+        self.stimulate()
+
+    def visualization_changed(self, dummyA=None, dummyB=None):
+        """[visualization_changed] switches between lights, sun-path markers, the animated sun and the baked sky to
+        match [cmbx_visualization]."""
+        self.visualization = self.cmbx_visualization.model.get_item_value_model().as_int
+        self.stimulate()
+
+    def ephemeris_toggled(self, dummy=None):
+        """[ephemeris_toggled] reads sun positions from per-site tables in the temp directory while [chbx_ephemeris] is checked."""
+        self.ephemeris_dir = os.path.join(tempfile.gettempdir(), "jolly.sunvec") if read_bool(self.chbx_ephemeris) else None
+        if self.ephemeris_dir is None:
+            self.ephemeris_key, self.ephemeris_table = None, None
+        self.stimulate()
+
+    def adaptive_spacing_changed(self, dummy=None):
+        """[adaptive_spacing_changed(dummy)] updates [self.adaptive_spacing] to match the float field [self.ff_adaptive_spacing]."""
+        spacing = read_float(self.ff_adaptive_spacing)
+        if spacing <= 0:
+            print("JOLLY.SUNVEC..angular spacing must be positive, keeping " + str(self.adaptive_spacing))
+            write(self.ff_adaptive_spacing, self.adaptive_spacing)
+            return
+        self.adaptive_spacing = spacing
+        self.stimulate()
+
+    def profiling_toggled(self, dummy=None):
+        """[profiling_toggled] records pipeline timings and counters (see profiling.py) while [chbx_profiling] is checked."""
+        PROFILER.enabled = read_bool(self.chbx_profiling)
+        self.refresh_stats()
+
+    def profile_extras(self):
+        """[profile_extras()] is the sun position cache and rebuild scheduler counters, as report sections."""
+        return {"cache": self.sunpos_cache.stats(), "scheduler": {"requests": self.scheduler.requests, \
+            "rebuilds": self.scheduler.rebuilds, "cancellations": self.scheduler.cancellations}}
+
+    def refresh_stats(self):
+        """[refresh_stats()] shows the latest profiler summary in [self.lbl_profile]."""
+        if not(PROFILER.enabled):
+            self.lbl_profile.text = "Recording is off."
+            return
+        cache = self.sunpos_cache.stats()
+        lines = PROFILER.summary() + [F"cache: {cache['hit_rate']:.0%} hits, {cache['entries']} batches, " \
+            F"{cache['bytes'] / 2**20:.1f} of {cache['max_bytes'] / 2**20:.0f} MiB", \
+            F"scheduler: {self.scheduler.requests} requests, {self.scheduler.rebuilds} rebuilds, " \
+            F"{self.scheduler.cancellations} cancelled"]
+        self.lbl_profile.text = "\n".join(lines)
+
+    def reset_profile(self):
+        """[reset_profile()] clears the profiler and the cache hit/miss counters."""
+        PROFILER.reset()
+        self.sunpos_cache.reset_counters()
+        self.refresh_stats()
+
+    def dump_profile(self):
+        """[dump_profile()] writes the profiler report and [profile_extras()] as JSON to [self.profile_path]."""
+        os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+        PROFILER.dump(self.profile_path, **self.profile_extras())
+        print("JOLLY.SUNVEC..wrote profile to " + self.profile_path)
+
+    def export_toggled(self, dummy=None):
+        """[export_toggled] writes suns into the layer file while [chbx_export] is checked, and back into the edit
+        layer (detaching the file) once it is unchecked."""
+        self.export_toggle = read_bool(self.chbx_export)
+        if not(self.export_toggle):
+            detach_layer(self.export_path)
+        self.stimulate()
+
+    def export_path_changed(self, dummy=None):
+        """[export_path_changed(dummy)] moves the export layer to the file named in [self.sf_export_path]."""
+        path = read_string(self.sf_export_path).strip()
+        if not path.endswith((".usdc", ".usda", ".usd")):
+            print(F"JOLLY.SUNVEC..export layer {path} is not a .usdc, .usda or .usd file, keeping {self.export_path}")
+            write(self.sf_export_path, self.export_path)
+            return
+        detach_layer(self.export_path)
+        self.export_path = os.path.abspath(path)
+        self.stimulate()
+
+    def engine_changed(self, dummyA=None, dummyB=None):
+        """[engine_changed] picks the solar model of interactive rebuilds to match [cmbx_engine]."""
+        self.engine = self.cmbx_engine.model.get_item_value_model().as_int
+        self.stimulate()
+
+    def sky_width_changed(self, dummyA=None, dummyB=None):
+        """[sky_width_changed] sets the baked sky texture width to match [cmbx_sky_width]."""
+        self.sky_width = SKY_WIDTHS[self.cmbx_sky_width.model.get_item_value_model().as_int]
+        self.stimulate()
+
+    def sky_kernel_changed(self, dummy=None):
+        """[sky_kernel_changed(dummy)] updates [self.sky_kernel] to match the float field [self.ff_sky_kernel]."""
+        kernel = read_float(self.ff_sky_kernel)
+        if kernel < 0:
+            print("JOLLY.SUNVEC..sky glow width cannot be negative, keeping " + str(self.sky_kernel))
+            write(self.ff_sky_kernel, self.sky_kernel)
+            return
+        self.sky_kernel = kernel
+        self.stimulate()
+
+    def bake_engine_changed(self, dummyA=None, dummyB=None):
+        """[bake_engine_changed] picks the solar model of "Place Suns" to match [cmbx_bake_engine]."""
+        self.bake_engine = self.cmbx_bake_engine.model.get_item_value_model().as_int
+
+    def cache_bytes_changed(self, dummy=None):
+        """[cache_bytes_changed(dummy)] resizes [self.sunpos_cache] to the MiB of the int slider [self.is_cache_mib]."""
+        self.cache_bytes = max(0, read_int(self.is_cache_mib)) * 2**20
+        self.sunpos_cache.resize(self.cache_bytes)
+        self.refresh_stats()
+
+    def cluster_count_changed(self, dummy=None):
+        """[cluster_count_changed(dummy)] updates [self.cluster_count] to match the int slider [self.is_cluster_count]."""
+        self.cluster_count = read_int(self.is_cluster_count)
+        self.stimulate()
+
     def intensity_changed(self, dummy=None):
         """[intensity_changed(intensity) updates the solar intensity."""
         self.intensity = self.is_intensity.model.as_int
@@ -296,6 +825,7 @@ class SunVec(omni.ext.IExt):
         """[pre_initialization()] creates extension scope and removes default world lighting; cleans remnants."""
         # Make directory for extension primitives.
         create_scope(self.extension_dump[0:len(self.extension_dump)-1])
+        self.live_suns = {}
         
         # Remove defaultLight TODO: Disable all non-sunVec lighting instead.
         create_distant_light("/World/", "defaultLight")
@@ -322,7 +852,24 @@ class SunVec(omni.ext.IExt):
     #   omniverse extension main   #
     #------------------------------#
     def on_startup(self, ext_id):
-
+        omni.kit.commands.register(AuthorSunsCommand)
+        omni.kit.commands.register(AuthorPointsCommand)
+        omni.kit.commands.register(AuthorAnimatedSunCommand)
+        omni.kit.commands.register(AuthorDomeCommand)
+        omni.kit.commands.register(AuthorCurvesCommand)
+
+        self.sunpos_cache = SunposCache(self.cache_bytes)
+
+        # Sun sets are planned on a worker thread; only [author_plan] runs on the UI thread.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.scheduler = RebuildScheduler(self.rebuild, omni.kit.app.get_app().next_update_async, \
+            compute=self.plan_suns, executor=self._executor)
+        # "Place Suns" and the sun-path diagram plan with [self.bake_engine] on the same worker, so the UI never waits
+        # on the slow tier.
+        self.bake_scheduler = RebuildScheduler(self.rebuild, omni.kit.app.get_app().next_update_async, \
+            compute=lambda token: self.plan_suns(token, self.bake_engine), executor=self._executor)
+        self.diagram_scheduler = RebuildScheduler(self.draw_diagram, omni.kit.app.get_app().next_update_async, \
+            compute=lambda token: self.plan_diagram(token, self.bake_engine), executor=self._executor)
         self.pre_initialization()
 
         ############################
@@ -344,8 +891,11 @@ class SunVec(omni.ext.IExt):
                         if self.mode    == 0:   self.visibles.island_enable(self.vg_subdivide)
                         elif self.mode  == 1:   self.visibles.island_enable(self.vg_step)
                         elif self.mode  == 2:   self.visibles.island_enable(self.vg_step_until)
+                        elif self.mode  == 3:   self.visibles.island_enable(self.vg_adaptive)
                 combo_box("Increment Type",\
-                    ("Subdivide", "Step", "Step Until"), (ITEM_CHANGED, mode_changed_fn))
+                    ("Subdivide", "Step", "Step Until", "Adaptive"), (ITEM_CHANGED, mode_changed_fn))
+                self.cmbx_anchor = combo_box("Anchor Range On",\
+                    ("Start and End Dates", "Sunrise to Sunset", "June to December Solstice"), (ITEM_CHANGED, self.anchor_changed))
                 
                 # Incremental Stepsize
                 frame_increment = ui.Frame() ### VISION GROUP
@@ -364,6 +914,14 @@ class SunVec(omni.ext.IExt):
 
                 self.is_inc_steps = int_slider("Number of Increments", 0, 100, \
                     (END_EDIT, self.inc_steps_changed))
+
+                # Angular Spacing
+                frame_adaptive = ui.Frame() ### VISION GROUP
+                self.vg_adaptive.add(frame_adaptive)
+                with frame_adaptive:
+                    with ui.VStack():
+                        self.ff_adaptive_spacing = float_field("Angular Spacing (degrees)", 0.01, 90, \
+                            (END_EDIT, self.adaptive_spacing_changed))
                 
                 separate()
 
@@ -386,6 +944,7 @@ class SunVec(omni.ext.IExt):
                     vstack_setting_end = ui.VStack(height=15) ### VISION GROUP
                     self.vg_subdivide.add(vstack_setting_end)
                     self.vg_step_until.add(vstack_setting_end)
+                    self.vg_adaptive.add(vstack_setting_end)
                     with vstack_setting_end:
                         self.lb_end_date = labeled_label("Starting Date", height=30)
                         self.is_end_year = int_slider("Year", 1901, 2099, (END_EDIT, self.end_changed))
@@ -404,13 +963,41 @@ class SunVec(omni.ext.IExt):
                     self.cmbx_color_filter = combo_box("Colorblind Options",\
                         ("Full Color", "Protanopia", "Deuteranopia", "Tritanopia"), (ITEM_CHANGED, self.color_filter_changed))
                 self.is_intensity = int_slider("Light Intensity", 0, 200, (END_EDIT, self.intensity_changed))
+                self.cmbx_visualization = combo_box("Visualization",\
+                    ("Lights", "Sun-Path Markers", "Animated Sun", "Baked Sky Dome"), \
+                    (ITEM_CHANGED, self.visualization_changed))
+                self.is_cluster_count = int_slider("Clustered Lights (0 = one per sample)", 0, 64, \
+                    (END_EDIT, self.cluster_count_changed))
+                self.cmbx_sky_width = combo_box("Sky Texture Width", [str(width) for width in SKY_WIDTHS], \
+                    (ITEM_CHANGED, self.sky_width_changed))
+                self.ff_sky_kernel = float_field("Sky Glow Width (degrees)", 0, 30, (END_EDIT, self.sky_kernel_changed))
+                self.cmbx_engine = combo_box("Preview Solar Model", ENGINE_NAMES, (ITEM_CHANGED, self.engine_changed))
+                self.cmbx_bake_engine = combo_box("\"Place Suns\" Solar Model", ENGINE_NAMES, \
+                    (ITEM_CHANGED, self.bake_engine_changed))
+                self.is_cache_mib = int_slider("Position Cache (MiB)", 0, 256, (END_EDIT, self.cache_bytes_changed))
+                self.chbx_ephemeris = check_box("Use Ephemeris Tables", (VALUE_CHANGED, self.ephemeris_toggled))
+                self.chbx_export = check_box("Write Suns to Layer File", (VALUE_CHANGED, self.export_toggled))
+                self.sf_export_path = string_field("Layer File (.usdc)", (END_EDIT, self.export_path_changed))
+                with ui.HStack():
+                    ui.Button("Attach Layer", clicked_fn=lambda: attach_layer(self.export_path), height=30)
+                    ui.Button("Detach Layer", clicked_fn=lambda: detach_layer(self.export_path), height=30)
 
                 separate()
 
                 # Place should be irrelevant now by listeners.
                 # ui.Button("Place Sun", clicked_fn=lambda: self.stimulate(), height=50)
-                ui.Button("Place Suns", clicked_fn=lambda: self.position_suns(), height=50)
+                ui.Button("Place Suns", clicked_fn=lambda: self.place_suns(), height=50)
+                ui.Button("Draw Sun-Path Diagram", clicked_fn=lambda: self.diagram_scheduler.request(), height=50)
                 ui.Button("Clean-Up", clicked_fn=lambda: self.cleanup(), height=50)
+
+                with ui.CollapsableFrame("Profiling", collapsed=True):
+                    with ui.VStack():
+                        self.chbx_profiling = check_box("Record Timings", (VALUE_CHANGED, self.profiling_toggled))
+                        self.lbl_profile = ui.Label("Recording is off.", word_wrap=True)
+                        with ui.HStack():
+                            ui.Button("Refresh", clicked_fn=lambda: self.refresh_stats(), height=30)
+                            ui.Button("Reset", clicked_fn=lambda: self.reset_profile(), height=30)
+                            ui.Button("Dump JSON", clicked_fn=lambda: self.dump_profile(), height=30)
             ##########################
             #   End User Interface   #
             ##########################
@@ -420,5 +1007,16 @@ class SunVec(omni.ext.IExt):
         # on_startup() ends here
             
     def on_shutdown(self):
+        self.scheduler.cancel()
+        self.bake_scheduler.cancel()
+        self.diagram_scheduler.cancel()
+        self._executor.shutdown(wait=False)
         self.cleanup()
+        remove_skies(self.sky_textures)
+        self.sky_textures = ()
+        omni.kit.commands.unregister(AuthorSunsCommand)
+        omni.kit.commands.unregister(AuthorPointsCommand)
+        omni.kit.commands.unregister(AuthorAnimatedSunCommand)
+        omni.kit.commands.unregister(AuthorDomeCommand)
+        omni.kit.commands.unregister(AuthorCurvesCommand)
         print("JOLLY.SUNVEC..shutdown")
\ No newline at end of file
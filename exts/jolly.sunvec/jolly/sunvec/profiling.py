@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+"""
+Opt-in timing spans and counters for the rebuild pipeline.
+While [PROFILER.enabled] is False every span and counter is a no-op, so the instrumentation can stay in place.
+"""
+
+class Profiler():
+    """
+    [Profiler()] accumulates, per name, the call count and total/last/max seconds of [span]s
+    and the running totals of [count]s; it may be fed from the UI thread and worker threads at once.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def reset(self):
+        """[reset()] forgets every span and counter recorded so far."""
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self._started = time.time()
+
+    @contextmanager
+    def span(self, name):
+        """[with span(name):] records the wall time of the block under [name]."""
+        if not(self.enabled):
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        """[record(name, seconds)] adds one call of [seconds] to the span [name]."""
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                self.spans[name] = {"calls": 1, "total": seconds, "last": seconds, "max": seconds}
+            else:
+                stats["calls"] += 1
+                stats["total"] += seconds
+                stats["last"] = seconds
+                stats["max"] = max(stats["max"], seconds)
+
+    def count(self, name, n=1):
+        """[count(name, n)] adds [n] to the counter [name]."""
+        if not(self.enabled):
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, **extra):
+        """[report(**extra)] is a JSON-ready dict of every span (with its mean) and counter, plus [extra] sections."""
+        with self._lock:
+            spans = {name: dict(stats, mean=stats["total"] / stats["calls"]) for name, stats in self.spans.items()}
+            counters = dict(self.counters)
+        return dict({"since": self._started, "spans": spans, "counters": counters}, **extra)
+
+    def dump(self, path, **extra):
+        """[dump(path, **extra)] writes [report(**extra)] to the JSON file [path]."""
+        with open(path, "w") as f:
+            json.dump(self.report(**extra), f, indent=2, sort_keys=True)
+
+    def summary(self):
+        """[summary()] is the report as short human-readable lines, spans by total time first."""
+        report = self.report()
+        lines = []
+        for name, stats in sorted(report["spans"].items(), key=lambda item: -item[1]["total"]):
+            lines.append(F"{name}: {stats['calls']}x, last {stats['last'] * 1e3:.2f} ms, " \
+                F"mean {stats['mean'] * 1e3:.2f} ms, max {stats['max'] * 1e3:.2f} ms")
+        for name, value in sorted(report["counters"].items()):
+            lines.append(F"{name}: {value}")
+        return lines
+
+
+# The one profiler the extension and its authoring helpers report to.
+PROFILER = Profiler()
@@ -0,0 +1,71 @@
+import numpy as np
+from jolly.sunvec.setting import SettingArray, SettingRange
+from jolly.sunvec.sunpos import solar_angles, sun_directions
+
+"""
+Adaptive sampling of a sun path: instants are placed by angular separation on the sky instead of evenly in time.
+
+The range is split breadth-first; every interval whose endpoints are further apart than the target angle is cut
+into as many parts as that separation asks for, and one whose midpoint strays further than the tolerance from the
+great arc between its endpoints is halved. A whole level of intervals is solved in one vectorized [solar_angles] call.
+"""
+
+SEED_SECONDS = 6 * 3600  # Longest first interval, so a path that loops back on itself (days, years) is never skipped.
+MIN_STEP = 1  # Intervals are never split below this many seconds.
+
+def directions_at(utc_epochs, lat, long, refraction=True):
+    """[directions_at(utc_epochs, lat, long, refraction)] is the (N, 3) unit vector toward the sun at every UTC epoch."""
+    azimuth, elevation = solar_angles(np.asarray(utc_epochs) / 86400 - 0.5, lat, long, refraction)
+    return sun_directions(azimuth, elevation)
+
+def angle_between(a, b):
+    """[angle_between(a, b)] is the angle in degrees between the rows of the unit vectors [a] and [b]."""
+    return np.degrees(np.arccos(np.clip(np.einsum("ij,ij->i", a, b), -1, 1)))
+
+def adaptive_epochs(first, last, lat, long, max_angle, tolerance=None, refraction=True, limit=None):
+    """[adaptive_epochs(first, last, lat, long, max_angle, tolerance, refraction, limit)] is the sorted UTC epochs
+    from [first] to [last] (inclusive) such that neighbouring suns are at most [max_angle] degrees apart and, if
+    [tolerance] is given, the path between them strays at most [tolerance] degrees from a great arc.
+    NOTE: Refinement stops before the level that would exceed [limit] samples, so the result stays evenly refined;
+    the first level (one sample per SEED_SECONDS) is always kept."""
+    first, last = int(first), int(last)
+    if last <= first:
+        return np.array([first], dtype=np.int64)
+    seeds = -(-(last - first) // SEED_SECONDS)
+    epochs = np.unique(np.linspace(first, last, seeds + 1).round().astype(np.int64))
+    directions = directions_at(epochs, lat, long, refraction)
+
+    while True:
+        starts, ends = epochs[:-1], epochs[1:]
+        separation = angle_between(directions[:-1], directions[1:])
+        split = ((ends - starts) > MIN_STEP) & (separation > max_angle)
+        # Too-wide intervals get as many parts as the separation asks for, not just halves, so spacing lands
+        # near [max_angle] instead of anywhere down to half of it.
+        parts = np.where(split, np.ceil(separation / max_angle), 1).astype(np.int64)
+        if tolerance is not None:
+            # Midpoints of the unsplit intervals only need solving to check the tolerance.
+            check = ~split & ((ends - starts) > MIN_STEP)
+            middles = (starts[check] + ends[check]) // 2
+            chord = directions[:-1][check] + directions[1:][check]
+            chord /= np.maximum(np.linalg.norm(chord, axis=1, keepdims=True), 1e-12)
+            strays = angle_between(directions_at(middles, lat, long, refraction), chord) > tolerance
+            parts[np.flatnonzero(check)[strays]] = 2
+        parts = np.minimum(parts, np.maximum(ends - starts, 1))
+        count = int((parts - 1).sum())
+        if count == 0 or (limit is not None and len(epochs) + count > limit):
+            return epochs
+        interval = np.repeat(np.arange(len(parts)), parts - 1)
+        part = np.arange(count) - np.repeat(np.cumsum(parts - 1) - (parts - 1), parts - 1) + 1
+        inserted = starts[interval] + (ends[interval] - starts[interval]) * part // parts[interval]
+        order = np.argsort(np.concatenate((epochs, inserted)), kind="stable")
+        epochs = np.concatenate((epochs, inserted))[order]
+        directions = np.concatenate((directions, directions_at(inserted, lat, long, refraction)))[order]
+
+def adaptive_array(setting_range: SettingRange, max_angle, tolerance=None, refraction=True, limit=None):
+    """[adaptive_array(setting_range, max_angle, tolerance, refraction, limit)] is the SettingArray of
+    [adaptive_epochs] over [setting_range], in its local time."""
+    start, end = setting_range.start, setting_range.end
+    offset = start.timezone * 3600
+    epochs = adaptive_epochs(start.epoch - offset, end.epoch - offset, start.lat, start.long, \
+        max_angle, tolerance, refraction, limit)
+    return SettingArray(start.lat, start.long, epochs + offset, start.timezone)
@@ -0,0 +1,111 @@
+import asyncio
+import traceback
+
+"""
+RebuildScheduler turns bursts of "something changed" notifications into a single rebuild.
+Optionally the heavy part of the rebuild is computed off the UI thread and abandoned when the user edits again.
+"""
+
+class RebuildCancelled(Exception):
+    pass
+
+
+class CancelToken():
+    """
+    [CancelToken()] is handed to a background computation, which should call [check()] between chunks of work.
+    """
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        """[check()] raises RebuildCancelled once [cancel()] has been called."""
+        if self.cancelled:
+            raise RebuildCancelled()
+
+
+class RebuildScheduler():
+    """
+    [RebuildScheduler(rebuild, wait, debounce, compute, executor)] calls [rebuild()] once after any number of
+    [request()] calls, as soon as one [wait()] passes with no new request; [wait] is a coroutine function such as
+    Kit's next_update_async (one UI frame), and defaults to sleeping [debounce] seconds on the asyncio loop.
+    With [compute], [compute(token)] runs in [executor] first and its result is passed as [rebuild(result)] on
+    the loop's thread; a request arriving meanwhile cancels the token and the computation starts over.
+    An exception from [compute] or [rebuild] is printed with its traceback and drops that rebuild.
+    """
+    def __init__(self, rebuild, wait=None, debounce=0.0, compute=None, executor=None):
+        self.rebuild = rebuild
+        self.wait = wait if wait is not None else (lambda: asyncio.sleep(debounce))
+        self.compute = compute
+        self.executor = executor
+        self.requests = 0
+        self.rebuilds = 0
+        self.cancellations = 0
+        self._task = None
+        self._token = None
+
+    def dirty(self):
+        """[dirty()] is True while a rebuild has been requested but not yet run."""
+        return self._task is not None and not(self._task.done())
+
+    def request(self):
+        """[request()] marks the scene dirty; the rebuild is scheduled on the running asyncio loop."""
+        self.requests += 1
+        if self._token is not None:
+            self._token.cancel()
+        if not(self.dirty()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            await self._rebuild_when_settled()
+        except Exception:
+            print("JOLLY.SUNVEC..rebuild failed")
+            traceback.print_exc()
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    async def _rebuild_when_settled(self):
+        while True:
+            seen = None
+            while seen != self.requests:
+                seen = self.requests
+                await self.wait()
+            if self.compute is None:
+                break
+            self._token = token = CancelToken()
+            try:
+                result = await asyncio.get_event_loop().run_in_executor(self.executor, self.compute, token)
+            except RebuildCancelled:
+                result = None
+            finally:
+                self._token = None
+            if not(token.cancelled) and seen == self.requests:
+                break
+            self.cancellations += 1
+        self.rebuilds += 1
+        if self.compute is None:
+            self.rebuild()
+        else:
+            self.rebuild(result)
+
+    def cancel(self):
+        """[cancel()] drops a pending rebuild, if any, and cancels its computation."""
+        if self._token is not None:
+            self._token.cancel()
+        if self.dirty():
+            self._task.cancel()
+        self._task = None
+
+    def flush(self):
+        """[flush()] runs a pending rebuild right away, on the calling thread, instead of waiting for the loop."""
+        if self.dirty():
+            self.cancel()
+            self.rebuilds += 1
+            if self.compute is None:
+                self.rebuild()
+            else:
+                self.rebuild(self.compute(CancelToken()))
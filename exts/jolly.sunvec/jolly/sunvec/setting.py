@@ -1,5 +1,6 @@
-import copy
 from math import floor
+from operator import itemgetter
+import numpy as np
 
 """
 TODO: Improve precision and document/refactor.
@@ -12,19 +13,78 @@ TS * int -> TS (scale span)
 S + TS -> S (transpose setting)
 S - S -> TS (span between settings)
 S << S -> Bool (setting occurs before setting)
+
+Settings are backed by [epoch], the local clock time in whole seconds since 2000-01-01 00:00,
+so the operators above are constant time no matter how long the span is.
+
+Settings and Timespans are immutable tuples with named fields: they cost no per-instance __dict__, hand out
+their tuples without copying, and compare and hash by value, so either can key a dict or a cache.
 """
 
 
+def days_from_civil(year, month, day):
+    """
+    [days_from_civil(year, month, day)] is the number of days from 2000-01-01 to the Gregorian date;
+    also elementwise for integer arrays.
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 730425
+
+# Days in every month of a common year.
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+def days_in_month(year, month):
+    """
+    [days_in_month(year, month)] is the number of days in the [month] of the [year] (1901 to 2099);
+    also elementwise for integer arrays.
+    """
+    return MONTH_DAYS[np.asarray(month) - 1] \
+        + ((np.asarray(month) == 2) & (np.asarray(year) % 4 == 0))
+
+def civil_from_days(days):
+    """
+    [civil_from_days(days)] is the Gregorian (year, month, day) lying [days] days after 2000-01-01.
+    """
+    days += 730425
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = shifted_month + (3 if shifted_month < 10 else -9)
+    return (year_of_era + era * 400 + (month <= 2), month, day)
+
+
+class Timespan(tuple):
+    """
+    [Timespan(years, months, days, hours, minutes, seconds)] is the tuple of those fields, each also named.
+    """
+    __slots__ = ()
 
-class Timespan():
-    def __init__(self, years, months, days, hours, minutes, seconds):
-        self.years = years
-        self.months = months
-        self.days = days
-        self.hours = hours
-        self.minutes = minutes
-        self.seconds = seconds
+    def __new__(cls, years, months, days, hours, minutes, seconds):
+        return tuple.__new__(cls, (years, months, days, hours, minutes, seconds))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    years = property(itemgetter(0))
+    months = property(itemgetter(1))
+    days = property(itemgetter(2))
+    hours = property(itemgetter(3))
+    minutes = property(itemgetter(4))
+    seconds = property(itemgetter(5))
     
+    def calendar_split(self):
+        """[calendar_split()] is (months, seconds): the whole years and months of this timespan as a number of
+        calendar months, and everything else (days, hours, ..., and any fraction of a year or month) in seconds."""
+        months = int(self.years) * 12 + int(self.months)
+        return months, self.to_seconds() - 31556952 * int(self.years) - 2628288 * int(self.months)
+
     def nonnegative(self):
         return self.to_seconds() >= 0
     
@@ -74,7 +134,7 @@ class Timespan():
             self.hours - other.hours, \
             self.minutes - other.minutes, \
             self.seconds - other.seconds)
-        return(self.__from_seconds(unconsolidated.to_seconds()))
+        return(Timespan.from_seconds(unconsolidated.to_seconds()))
 
     """
     [__mul__(f)] is the same proportion of this timespan as f is to 1. 
@@ -107,97 +167,105 @@ class Timespan():
         seconds = total
         return Timespan(years, months, days, hours, minutes, seconds)
 
+    __rmul__ = __mul__
+
 
 
 """
-Setting is an immutable representation of a date.
+Setting is an immutable representation of a date: the tuple (date, loc, epoch), with every field also named.
 """
-class Setting():
-    
+class Setting(tuple):
+    __slots__ = ()
+
     def is_not_leap(year): 
         return year%4 != 0
 
-    def max_of_month(self, month, year):
+    def max_of_month(month, year):
         maxes = [29,31,28,31,30,31,30,31,31,30,31,30,31]
         return maxes[month * ( 1 - (year%4 == 0)*(month == 2))]
 
     """
     [valid_day(day, month, year) is True if [day] is a valid day of the [month] in the [year].]
     """
-    def valid_day(self, day, month, year):
-        return True if 1 <= month and month <= 12 and day >= 1 and day <= self.max_of_month(month, year) else False
+    def valid_day(day, month, year):
+        return True if 1 <= month and month <= 12 and day >= 1 and day <= Setting.max_of_month(month, year) else False
             
     """
-    [__init__(lat, long, year, month, day, hour, minute, second, timezone)] is a time and place on Earth.
+    [Setting(lat, long, year, month, day, hour, minute, second, timezone)] is a time and place on Earth.
     NOTE: Year must be of range 1901 to 2099; time change is not accounted for.
     """
-    def __init__(self, lat, long, year, month, day, hour, minute, second, timezone):
-        self.lat = lat if -90 <= lat and lat <= 90 else (print(F"JOLLY.SUNVEC..invalid latitude={lat}, range -90 to 90, default 0"),0)[1]  # Functional python hack? Lol.. Why does it even evaluate that print?
-        self.long = long if -180 <= long and long <= 180 else (print(F"JOLLY.SUNVEC..invalid longitude={long}, range -180 to 180, default 0"), 0)[1]
-        self.year = year if 1901 <= year and year <= 2099 else (print(F"JOLLY.SUNVEC..invalid year={year}, range 1901 to 2099, default 2022"), 2022)[1]
-        self.month = month if 1 <= month and month <= 12 else (print(F"JOLLY.SUNVEC..invalid month={month}, default 7"), 7)[1]
-        self.day = day if self.valid_day(day, self.month, self.year) else (print(F"JOLLY.SUNVEC..invalid {day}, default 12"), 12)[1]
-        self.hour = hour if 0 <= hour and hour <= 23 else (print(F"JOLLY.SUNVEC..invalid hour={hour}, default 12"), 12)[1]
-        self.minute = minute if 0 <= minute and minute <= 59 else (print(F"JOLLY.SUNVEC..invalid minute={minute}, default 0"), 0)[1]
-        self.second = second if 0 <= second and second <= 59 else (print(F"JOLLY.SUNVEC..invalid second={second}, default 0"), 0)[1]
-        self.timezone = timezone if -14 <= timezone and timezone <= 12 else (print(F"JOLLY.SUNVEC..invalid timezone={timezone}, default -6"), -6)[1]  #  TODO: Automate timezone from coordinates? Possible.
-        self.date = (self.year, self. month, self.day, self.hour, self.minute, self.second, self.timezone)
-        self.loc = (self.lat, self.long)
+    def __new__(cls, lat, long, year, month, day, hour, minute, second, timezone):
+        lat = lat if -90 <= lat and lat <= 90 else (print(F"JOLLY.SUNVEC..invalid latitude={lat}, range -90 to 90, default 0"),0)[1]  # Functional python hack? Lol.. Why does it even evaluate that print?
+        long = long if -180 <= long and long <= 180 else (print(F"JOLLY.SUNVEC..invalid longitude={long}, range -180 to 180, default 0"), 0)[1]
+        year = year if 1901 <= year and year <= 2099 else (print(F"JOLLY.SUNVEC..invalid year={year}, range 1901 to 2099, default 2022"), 2022)[1]
+        month = month if 1 <= month and month <= 12 else (print(F"JOLLY.SUNVEC..invalid month={month}, default 7"), 7)[1]
+        day = day if Setting.valid_day(day, month, year) else (print(F"JOLLY.SUNVEC..invalid {day}, default 12"), 12)[1]
+        hour = hour if 0 <= hour and hour <= 23 else (print(F"JOLLY.SUNVEC..invalid hour={hour}, default 12"), 12)[1]
+        minute = minute if 0 <= minute and minute <= 59 else (print(F"JOLLY.SUNVEC..invalid minute={minute}, default 0"), 0)[1]
+        second = second if 0 <= second and second <= 59 else (print(F"JOLLY.SUNVEC..invalid second={second}, default 0"), 0)[1]
+        timezone = timezone if -14 <= timezone and timezone <= 12 else (print(F"JOLLY.SUNVEC..invalid timezone={timezone}, default -6"), -6)[1]  #  TODO: Automate timezone from coordinates? Possible.
+        epoch = days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+        return tuple.__new__(cls, ((year, month, day, hour, minute, second, timezone), (lat, long), epoch))
+
+    def __getnewargs__(self):
+        return self.loc + self.date
+
+    date = property(itemgetter(0))
+    loc = property(itemgetter(1))
+    epoch = property(itemgetter(2))
+    lat = property(lambda self: self[1][0])
+    long = property(lambda self: self[1][1])
+    year = property(lambda self: self[0][0])
+    month = property(lambda self: self[0][1])
+    day = property(lambda self: self[0][2])
+    hour = property(lambda self: self[0][3])
+    minute = property(lambda self: self[0][4])
+    second = property(lambda self: self[0][5])
+    timezone = property(lambda self: self[0][6])
 
     """
-    [setting + timespan] is the [setting] advanced for the interval of time in [timespan].
+    [from_epoch(lat, long, epoch, timezone)] is the Setting at local clock time [epoch] (see module notes).
     """
-    def __eq__(self, setting2 : 'Setting'):
-        return self.date == setting2.date and self.loc == setting2.loc
+    def from_epoch(lat, long, epoch, timezone):
+        epoch = int(floor(epoch))
+        days, seconds = divmod(epoch, 86400)
+        year, month, day = civil_from_days(days)
+        hour, minute, second = seconds // 3600, (seconds % 3600) // 60, seconds % 60
+        if not(-90 <= lat <= 90 and -180 <= long <= 180 and 1901 <= year <= 2099 and -14 <= timezone <= 12):
+            return Setting(lat, long, year, month, day, hour, minute, second, timezone)
+        # The calendar fields of an epoch are valid by construction, so the checks in [__new__] are skipped.
+        return tuple.__new__(Setting, ((year, month, day, hour, minute, second, timezone), (lat, long), epoch))
 
     def get_date(self):
-        return copy.deepcopy(self.date)
+        return self[0]
 
     def get_loc(self):
-        return copy.deepcopy(self.loc)
+        return self[1]
 
+    """
+    [setting + timespan] is the [setting] advanced for the interval of time in [timespan].
+    """
     def __add__(self, interval: Timespan):
-        new_seconds = self.second + interval.seconds
-        new_minutes = self.minute + interval.minutes
-        new_hours = self.hour + interval.hours
-        new_day = self.day  #We manually step through larger units later to make sure month transitions are handled.
-        new_month = self.month
-        new_year = self.year
-
-        # Calculate how many days to advance; set smaller units.
-        new_minutes += (new_seconds // 60); new_seconds = new_seconds % 60
-        new_hours += (new_minutes // 60); new_minutes = new_minutes % 60
-        days_to_step = interval.days + (new_hours // 24); new_hours = new_hours % 24
-
-        for _ in range(0, int(days_to_step)):
-            if not(self.valid_day(new_day, self.month, self.year)):
-                new_day = 1
-                new_month += 1
-
-            if new_month > 12:
-                new_month = 1
-                new_year += 1
-
-            new_day += 1
-        
-        # The -1 +1 stuff is because Settings have months stored [1...12] where Timespans go [0...11]. 
-        new_year += (new_month - 1 + interval.months) // 12
-        new_month = ((new_month + (interval.months % 12) - 1)) % 12 + 1  
-
-        
-        return(Setting(self.lat, self.long, int(new_year), int(new_month), int(new_day), \
-             int(new_hours), int(new_minutes), int(new_seconds), int(self.timezone)))
+        # Whole years and months move the calendar date (the day clamped to the end of the month), so the clock
+        # time is kept; the rest moves the clock.
+        months, seconds = interval.calendar_split()
+        epoch = self.epoch
+        if months:
+            year, month = divmod(self.year * 12 + self.month - 1 + months, 12)
+            month += 1
+            day = min(self.day, Setting.max_of_month(month, year))
+            epoch = days_from_civil(year, month, day) * 86400 + self.hour * 3600 + self.minute * 60 + self.second
+        return Setting.from_epoch(self.lat, self.long, epoch + seconds, int(self.timezone))
     
     def __sub__(self, setting: 'Setting'):
-        return Timespan.from_seconds(Timespan.to_seconds(Timespan.from_setting(self)) - \
-             Timespan.to_seconds(Timespan.from_setting(setting)))
+        return Timespan.from_seconds(self.epoch - setting.epoch)
 
     """
     [setting1 << setting2] is True if the date of setting1 occurs no later than the date of setting2.
     NOTE: Timezones and locations must match.
     """
     def __lshift__(self, setting2 : 'Setting'):
-        return Timespan.from_setting(self).to_seconds() < Timespan.from_setting(setting2).to_seconds()
+        return self.epoch < setting2.epoch
 
 
     def __str__(self):
@@ -222,6 +290,61 @@ class Setting():
          \n{time[self.hour]}:{min_str}:{sec_str}{time_suffix[self.hour//12]} \n@ {coord} {utc}")
 
 
+# Default number of instants per SettingArray yielded by the SettingRange *_chunks generators.
+CHUNK_SIZE = 65536
+
+"""
+SettingArray is a compact, immutable sequence of Settings sharing one place and timezone.
+"""
+class SettingArray():
+    """
+    [SettingArray(lat, long, epochs, timezone)] holds the instants [epochs] (see Setting.epoch) as one
+    contiguous int64 array; Setting objects are only built when indexed or iterated.
+    """
+    def __init__(self, lat, long, epochs, timezone):
+        self.lat = lat
+        self.long = long
+        self.timezone = timezone
+        self.loc = (lat, long)
+        self.epochs = np.ascontiguousarray(epochs, dtype=np.int64)
+        self.epochs.flags.writeable = False
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, list, np.ndarray)):
+            return SettingArray(self.lat, self.long, self.epochs[index], self.timezone)
+        return Setting.from_epoch(self.lat, self.long, int(self.epochs[index]), self.timezone)
+
+    def __iter__(self):
+        for epoch in self.epochs:
+            yield Setting.from_epoch(self.lat, self.long, int(epoch), self.timezone)
+
+    def get_loc(self):
+        return self.loc
+
+    def utc_epochs(self):
+        """[utc_epochs()] is [self.epochs] shifted from local clock time to UTC."""
+        return self.epochs - self.timezone * 3600
+
+    def daynums(self):
+        """[daynums()] is the days from J2000 of every instant, as taken by [sunpos.sunpos_daynum]."""
+        return self.utc_epochs() / 86400 - 0.5
+
+    def concatenate(arrays, location=None):
+        """[concatenate(arrays, location)] is one SettingArray holding the instants of every SettingArray in [arrays],
+        in order; if [arrays] is empty, it is an empty SettingArray at [location], a tuple (lat, long, timezone)."""
+        arrays = list(arrays)
+        if not arrays:
+            if location is None:
+                raise ValueError("no SettingArrays to concatenate and no location given")
+            lat, long, timezone = location
+            return SettingArray(lat, long, np.empty(0, dtype=np.int64), timezone)
+        first = arrays[0]
+        return SettingArray(first.lat, first.long, np.concatenate([array.epochs for array in arrays]), first.timezone)
+
+
 class SettingRange():
     ctr = 0
     """
@@ -257,20 +380,16 @@ class SettingRange():
             print("JOLLY.SUNVEC..end cannot occur before the start")
 
     def get_start_date(self):
-        return copy.deepcopy(self.start.date)
+        return self.start.date
 
     def get_end_date(self):
-        return copy.deepcopy(self.end.date)
+        return self.end.date
 
     def get_loc(self):
-        return copy.deepcopy(self.start.loc)
+        return self.start.loc
     
     def subdiv_range(self, divs):
-        settings = []
-        for i in range(0, divs):
-            settings.append(self.start + (self.span * (i/divs)))
-        settings.append(self.end)
-        return settings
+        return list(self.subdiv_array(divs))
 
     def increment_range(self, inc: Timespan, num):
         assert inc.to_seconds() > 0
@@ -298,3 +417,87 @@ class SettingRange():
                 break
         return settings
     
+
+    """
+    The *_array methods sample the same instants as the list methods above, but as one SettingArray
+    and without moving [self.start].
+    """
+    def location(self):
+        """[location()] is the (lat, long, timezone) every sample of this range shares."""
+        return (self.start.lat, self.start.long, self.start.timezone)
+
+    def as_array(self, epochs):
+        return SettingArray(self.start.lat, self.start.long, epochs, self.start.timezone)
+
+    def stepped(self, seconds, steps):
+        """[stepped(seconds, steps)] is the epochs [self.start] + [seconds] * k for every k in [steps]."""
+        return self.start.epoch + np.floor(seconds * steps).astype(np.int64)
+
+    def incremented(self, inc: Timespan, steps):
+        """[incremented(inc, steps)] is the epochs of [self.start] + [inc] * k for every k in [steps], each
+        moved from the start like [Setting.__add__], so monthly and yearly steps keep the clock time."""
+        months, seconds = inc.calendar_split()
+        steps = np.asarray(steps, dtype=np.int64)
+        if months == 0:
+            return self.stepped(seconds, steps)
+        start = self.start
+        year, month = np.divmod(start.year * 12 + start.month - 1 + months * steps, 12)
+        month += 1
+        day = np.minimum(start.day, days_in_month(year, month))
+        return days_from_civil(year, month, day) * 86400 + (start.hour * 3600 + start.minute * 60 + start.second) \
+            + np.floor(seconds * steps).astype(np.int64)
+
+    def until_steps(self, inc: Timespan):
+        """[until_steps(inc)] is how many whole [inc] fit between start and end (non-positive [inc] -> 1 second)."""
+        if (inc.to_seconds() <= 0):
+            print("JOLLY.SUNVEC..non-positive increments are not permitted, defaulting to 1 second")
+            inc = Timespan(0,0,0,0,0,1)
+        steps = int((self.end.epoch - self.start.epoch) // inc.to_seconds())
+        # Calendar months are not all the same length; settle the estimate on the true count.
+        while steps > 0 and self.incremented(inc, [steps])[0] > self.end.epoch:
+            steps -= 1
+        while self.incremented(inc, [steps + 1])[0] <= self.end.epoch:
+            steps += 1
+        return inc, steps
+
+    def subdiv_array(self, divs):
+        if divs <= 0:
+            return self.as_array([self.end.epoch])
+        span = self.end.epoch - self.start.epoch
+        return self.as_array(np.append(self.stepped(span / divs, np.arange(divs)), self.end.epoch))
+
+    def increment_array(self, inc: Timespan, num):
+        assert inc.to_seconds() > 0
+        return self.as_array(self.incremented(inc, np.arange(1, num + 1)))
+
+    def increment_until_array(self, inc: Timespan, limit=101):
+        inc, steps = self.until_steps(inc)
+        if steps > limit:
+            print(F"JOLLY.SUNVEC..increment too small to bridge starting and ending date, limiting to {limit} steps")
+            steps = limit
+        return self.as_array(self.incremented(inc, np.arange(1, steps + 1)))
+
+    """
+    The *_chunks methods are generators over the same instants as the *_array methods, yielding
+    SettingArrays of at most [chunk] samples; they are uncapped and hold one chunk in memory at a time.
+    """
+    def step_chunks(self, epochs_of, first, last, chunk):
+        """[step_chunks(epochs_of, first, last, chunk)] yields [epochs_of(steps)] for the steps [first] through
+        [last], [chunk] steps at a time."""
+        for k in range(first, last + 1, chunk):
+            yield self.as_array(epochs_of(np.arange(k, min(k + chunk, last + 1))))
+
+    def subdiv_chunks(self, divs, chunk=CHUNK_SIZE):
+        if divs > 0:
+            span = self.end.epoch - self.start.epoch
+            for settings in self.step_chunks(lambda steps: self.stepped(span / divs, steps), 0, divs - 1, chunk):
+                yield settings
+        yield self.as_array([self.end.epoch])
+
+    def increment_chunks(self, inc: Timespan, num, chunk=CHUNK_SIZE):
+        assert inc.to_seconds() > 0
+        return self.step_chunks(lambda steps: self.incremented(inc, steps), 1, num, chunk)
+
+    def increment_until_chunks(self, inc: Timespan, chunk=CHUNK_SIZE):
+        inc, steps = self.until_steps(inc)
+        return self.step_chunks(lambda steps: self.incremented(inc, steps), 1, steps, chunk)
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from jolly.sunvec.setting import Setting
+from jolly.sunvec.sunpos import solar_angles
+
+"""
+Batch solar positions for many sites at once, e.g. a site-selection study over a portfolio of locations.
+
+A site is a tuple (name, lat, long, timezone). Every site is sampled over the same local date range, so the
+results line up sample for sample. Sites are spread over a process pool in chunks. Only the Kit-free modules
+are imported, so this works in plain worker processes and from the command line:
+  > python -m jolly.sunvec.sites sites.csv positions.csv --start 2022-01-01T00:00 --end 2022-12-31T23:00 --step 3600
+"""
+
+LAT_COLUMNS = ("lat", "latitude")
+LONG_COLUMNS = ("long", "lon", "lng", "longitude")
+TIMEZONE_COLUMNS = ("timezone", "tz", "utc_offset")
+NAME_COLUMNS = ("name", "id", "site")
+EPOCH = np.datetime64("2000-01-01T00:00:00", "s")  # Local clock epoch 0 (see setting.py).
+
+def column(row, names):
+    """[column(row, names)] is the value of the first of [names] found in the csv [row] (case-insensitive), or None."""
+    for name in names:
+        if row.get(name) not in (None, ""):
+            return row[name]
+    return None
+
+def solar_timezone(long):
+    """[solar_timezone(long)] is the whole-hour offset of mean solar time at [long], for sites without a timezone."""
+    return int(max(-12, min(12, round(long / 15))))
+
+def load_sites_csv(path):
+    """[load_sites_csv(path)] is the list of sites in the csv file [path]; it needs a header with a latitude and a
+    longitude column, and may have name and timezone columns (see *_COLUMNS); timezones may be fractional hours.
+    Rows without coordinates, or with values that are not numbers, are skipped."""
+    sites = []
+    with open(path, newline="") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            row = {key.strip().lower(): value.strip() for key, value in row.items() if key is not None and value is not None}
+            lat, long = column(row, LAT_COLUMNS), column(row, LONG_COLUMNS)
+            if lat is None or long is None:
+                print(F"JOLLY.SUNVEC..{path} row {i + 1} has no coordinates, skipping")
+                continue
+            timezone = column(row, TIMEZONE_COLUMNS)
+            try:
+                lat, long = float(lat), float(long)
+                timezone = float(timezone) if timezone is not None else solar_timezone(long)
+            except ValueError:
+                print(F"JOLLY.SUNVEC..{path} row {i + 1} has a coordinate or timezone that is not a number, skipping")
+                continue
+            sites.append((column(row, NAME_COLUMNS) or str(i + 1), lat, long, timezone))
+    return sites
+
+def as_sites(sites):
+    """[as_sites(sites)] is [sites] with every (lat, long) pair completed to a (name, lat, long, timezone) site."""
+    completed = []
+    for i, site in enumerate(sites):
+        if len(site) == 2:
+            site = (str(i + 1), site[0], site[1], solar_timezone(site[1]))
+        completed.append(tuple(site))
+    return completed
+
+def check_date(date):
+    """[check_date(date)] is the (year, month, day, hour, minute, second) tuple [date] if Setting takes it as it
+    is, and raises ValueError otherwise, instead of letting Setting substitute its defaults."""
+    if not(1901 <= date[0] <= 2099):
+        raise ValueError(F"JOLLY.SUNVEC..year {date[0]} is outside 1901 to 2099")
+    datetime(*date)  # Raises ValueError on an invalid month, day or time.
+    return tuple(date)
+
+def local_epochs(start, end, step):
+    """[local_epochs(start, end, step)] is the local clock epochs (see setting.py) from the date tuple [start]
+    through [end] every [step] seconds; the same for every site. Dates Setting cannot hold raise ValueError."""
+    start, end = check_date(start), check_date(end)
+    first, last = Setting(0, 0, *start, 0), Setting(0, 0, *end, 0)
+    return np.arange(first.epoch, max(first.epoch, last.epoch) + 1, step, dtype=np.int64)
+
+def solve_sites(sites, epochs, refraction=True):
+    """[solve_sites(sites, epochs, refraction)] is the sun's float32 azimuth and elevation in degrees at every
+    local clock epoch of [epochs], as two (sites, samples) arrays; one chunk of work for a pool worker."""
+    azimuth = np.empty((len(sites), len(epochs)), dtype=np.float32)
+    elevation = np.empty((len(sites), len(epochs)), dtype=np.float32)
+    for i, (_, lat, long, timezone) in enumerate(sites):
+        azimuth[i], elevation[i] = solar_angles((epochs - timezone * 3600) / 86400 - 0.5, lat, long, refraction)
+    return (azimuth, elevation)
+
+def batch_positions(sites, start, end, step=3600, refraction=True, processes=None, chunksize=None):
+    """[batch_positions(sites, start, end, step, refraction, processes, chunksize)] is a generator of
+    (site, epochs, azimuth, elevation) for every one of [sites], in order: the shared local clock [epochs] from the
+    date tuple [start] through [end] every [step] seconds, and the sun's float32 azimuth and elevation at each.
+    NOTE: Workers are sent [chunksize] sites at a time (by default about four chunks per worker) and at most two
+    chunks per worker are in flight, so memory stays bounded however many sites there are; [processes]=0 solves
+    every chunk in this process."""
+    sites = as_sites(sites)
+    epochs = local_epochs(start, end, step)
+    epochs.flags.writeable = False
+    processes = (os.cpu_count() or 1) if processes is None else processes
+    chunksize = chunksize or max(1, -(-len(sites) // (max(processes, 1) * 4)))
+    chunks = [sites[first:first + chunksize] for first in range(0, len(sites), chunksize)]
+
+    def results(chunk, solved):
+        for site, azimuth, elevation in zip(chunk, *solved):
+            yield (site, epochs, azimuth, elevation)
+
+    if processes == 0 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from results(chunk, solve_sites(chunk, epochs, refraction))
+        return
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(solve_sites, chunk, epochs, refraction)))
+            if len(pending) >= 2 * processes:
+                chunk, future = pending.popleft()
+                yield from results(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from results(chunk, future.result())
+
+def batch_arrays(sites, start, end, step=3600, refraction=True, processes=None, chunksize=None):
+    """[batch_arrays(...)] is [batch_positions] gathered into a dict: "sites" (the site tuples), "epochs" (the
+    shared local clock epochs) and "azimuth", "elevation" as (sites, samples) float32 arrays."""
+    sites = as_sites(sites)
+    epochs = local_epochs(start, end, step)
+    azimuth = np.empty((len(sites), len(epochs)), dtype=np.float32)
+    elevation = np.empty((len(sites), len(epochs)), dtype=np.float32)
+    for i, (_, _, site_azimuth, site_elevation) in \
+            enumerate(batch_positions(sites, start, end, step, refraction, processes, chunksize)):
+        azimuth[i], elevation[i] = site_azimuth, site_elevation
+    return {"sites": sites, "epochs": epochs, "azimuth": azimuth, "elevation": elevation}
+
+def local_times(epochs):
+    """[local_times(epochs)] is the ISO 8601 local clock time of every epoch (see setting.py) in [epochs]."""
+    return np.datetime_as_string(EPOCH + np.asarray(epochs, dtype=np.int64).astype("timedelta64[s]"), unit="s")
+
+def write_csv(results, path):
+    """[write_csv(results, path)] streams the [batch_positions] generator [results] to the csv file [path], one
+    row per site and sample, as they arrive; it is the number of sites written."""
+    written = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("name", "lat", "long", "timezone", "local_time", "azimuth", "elevation"))
+        for (name, lat, long, timezone), epochs, azimuth, elevation in results:
+            count = len(epochs)
+            writer.writerows(zip([name] * count, [lat] * count, [long] * count, [timezone] * count, \
+                local_times(epochs).tolist(), azimuth.astype(np.float64).round(2).tolist(), elevation.astype(np.float64).round(2).tolist()))
+            written += 1
+    return written
+
+def date_tuple(text):
+    """[date_tuple(text)] is the (year, month, day, hour, minute, second) of the ISO 8601 [text] (see [check_date])."""
+    when = datetime.fromisoformat(text)
+    return check_date((when.year, when.month, when.day, when.hour, when.minute, when.second))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sun positions for every site of a csv over one local date range")
+    parser.add_argument("sites", help="csv with latitude and longitude columns, and optionally name and timezone")
+    parser.add_argument("output", help="csv to stream the positions to")
+    parser.add_argument("--start", type=date_tuple, required=True, help="local start, e.g. 2022-01-01T00:00")
+    parser.add_argument("--end", type=date_tuple, required=True, help="local end, e.g. 2022-12-31T23:00")
+    parser.add_argument("--step", type=int, default=3600, help="seconds between samples")
+    parser.add_argument("--no-refraction", action="store_true")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes; 0 runs in this process")
+    parser.add_argument("--chunksize", type=int, default=None, help="sites sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    sites = load_sites_csv(args.sites)
+    results = batch_positions(sites, args.start, args.end, args.step, not args.no_refraction, args.processes, args.chunksize)
+    print(F"JOLLY.SUNVEC..wrote {write_csv(results, args.output)} sites to {args.output}")
+
+if __name__ == "__main__":
+    main()
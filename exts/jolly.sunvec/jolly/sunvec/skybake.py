@@ -0,0 +1,205 @@
+import hashlib
+import os
+import numpy as np
+from jolly.sunvec.profiling import PROFILER
+
+"""
+Bakes sun samples into one lat-long HDR sky texture for a DomeLight, so a cumulative study costs one light to render.
+
+Every sample is splatted bilinearly into an energy histogram, blurred by a Gaussian of the requested angular width
+(along latitude through the poles, along longitude by FFT with a row width that grows toward the poles as the
+rows shrink), divided by each pixel's solid angle and written as a Radiance .hdr file.
+
+The texture is the usual Y-up lat-long layout of the dome's own frame: top row straight up, the image center
+facing the dome's -Z. DOME_ROTATION turns that frame onto the Z-up, +X east, +Y north stage of [sun_directions],
+which leaves the image center facing south.
+"""
+
+DOME_ROTATION = (90.0, 0.0, 0.0)  # xformOp:rotateXYZ of the DomeLight; dome +Y -> stage up, dome -Z -> stage north.
+BAKE_VERSION = 1  # Part of every cache key; bump when the texture layout or filtering changes.
+FWHM_TO_SIGMA = 1 / (2 * np.sqrt(2 * np.log(2)))
+
+def dome_directions(directions):
+    """[dome_directions(directions)] is the (N, 3) stage unit vectors [directions] in the dome's Y-up frame."""
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    return np.stack((directions[:, 0], directions[:, 2], -directions[:, 1]), axis=1)
+
+def latlong_coordinates(directions, width, height):
+    """[latlong_coordinates(directions, width, height)] is the continuous (column, row) of every stage direction in a
+    [width] x [height] lat-long image, with pixel centers on whole numbers."""
+    local = dome_directions(directions)
+    longitude = np.arctan2(local[:, 0], local[:, 2])
+    latitude = np.arcsin(np.clip(local[:, 1], -1, 1))
+    columns = (np.pi - longitude) / (2 * np.pi) * width - 0.5
+    rows = (np.pi / 2 - latitude) / np.pi * height - 0.5
+    return columns, rows
+
+def splat(directions, weights, width, height):
+    """[splat(directions, weights, width, height)] is the (height, width, 3) histogram of the (N, 3) RGB [weights]
+    shared bilinearly between the four pixels around every direction; columns wrap and rows clamp at the poles."""
+    weights = np.asarray(weights, dtype=np.float64).reshape(-1, 3)
+    columns, rows = latlong_coordinates(directions, width, height)
+    rows = np.clip(rows, 0, height - 1)
+    left, top = np.floor(columns), np.minimum(np.floor(rows), height - 2 if height > 1 else 0)
+    right_share, bottom_share = columns - left, rows - top
+    left = left.astype(np.int64) % width
+    top = top.astype(np.int64)
+    right = (left + 1) % width
+    bottom = np.minimum(top + 1, height - 1)
+    pixels = np.concatenate((top * width + left, top * width + right, bottom * width + left, bottom * width + right))
+    shares = np.concatenate(((1 - right_share) * (1 - bottom_share), right_share * (1 - bottom_share), \
+        (1 - right_share) * bottom_share, right_share * bottom_share))
+    image = np.empty((height * width, 3))
+    for channel in range(3):
+        image[:, channel] = np.bincount(pixels, weights=shares * np.tile(weights[:, channel], 4), minlength=height * width)
+    return image.reshape(height, width, 3)
+
+def row_latitudes(height):
+    """[row_latitudes(height)] is the latitude in radians of the center of every row of a lat-long image."""
+    return np.pi / 2 - (np.arange(height) + 0.5) / height * np.pi
+
+def blur_rows(image, sigma):
+    """[blur_rows(image, sigma)] is [image] blurred along latitude by a Gaussian of [sigma] degrees; what crosses a
+    pole comes back down the opposite meridian."""
+    height, width = image.shape[:2]
+    sigma_pixels = sigma / (180 / height)
+    if sigma_pixels < 0.25:
+        return image
+    pad = min(height, int(np.ceil(4 * sigma_pixels)))
+    # Rows past a pole are the rows before it, half a turn round.
+    over_top = np.roll(image[pad - 1::-1], width // 2, axis=1)
+    over_bottom = np.roll(image[:height - pad - 1:-1], width // 2, axis=1)
+    padded = np.concatenate((over_top, image, over_bottom))
+    size = len(padded) + pad
+    frequencies = np.fft.rfftfreq(size)
+    transfer = np.exp(-2 * np.pi**2 * sigma_pixels**2 * frequencies**2)
+    blurred = np.fft.irfft(np.fft.rfft(padded, n=size, axis=0) * transfer[:, None, None], n=size, axis=0)
+    return blurred[pad:pad + height]
+
+def blur_columns(image, sigma):
+    """[blur_columns(image, sigma)] is [image] blurred along longitude by a Gaussian of [sigma] degrees on the
+    sky, so [sigma] / cos(latitude) degrees of longitude on every row; rows wrap round."""
+    height, width = image.shape[:2]
+    if sigma / (360 / width) < 0.25:
+        return image
+    stretch = 1 / np.maximum(np.cos(row_latitudes(height)), 1 / width)
+    sigma_pixels = sigma / (360 / width) * stretch
+    frequencies = np.fft.rfftfreq(width)
+    transfer = np.exp(-2 * np.pi**2 * (sigma_pixels[:, None] * frequencies[None, :])**2)
+    return np.fft.irfft(np.fft.rfft(image, axis=1) * transfer[:, :, None], n=width, axis=1)
+
+def pixel_solid_angles(width, height):
+    """[pixel_solid_angles(width, height)] is the solid angle in steradians of one pixel of every row."""
+    return (2 * np.pi / width) * (np.sin(np.pi / 2 - np.arange(height) / height * np.pi) \
+        - np.sin(np.pi / 2 - (np.arange(height) + 1) / height * np.pi))
+
+def rasterize(directions, colors, width=1024, kernel=1.0):
+    """[rasterize(directions, colors, width, kernel)] is the (width / 2, width, 3) float32 radiance of a lat-long
+    sky holding a Gaussian of [kernel] degrees full width at half maximum around every row of the (N, 3) stage
+    unit vectors [directions], tinted by the rows of [colors]. Radiance integrates over the sphere to the mean
+    of [colors], so a season of samples is as bright as one average sun."""
+    height = max(1, width // 2)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    weights = np.asarray(colors, dtype=np.float64).reshape(-1, 3) / max(len(directions), 1)
+    energy = splat(directions, weights, width, height)
+    sigma = kernel * FWHM_TO_SIGMA
+    energy = blur_columns(blur_rows(energy, sigma), sigma)
+    radiance = np.maximum(energy, 0) / pixel_solid_angles(width, height)[:, None, None]
+    return radiance.astype(np.float32)
+
+def rgbe(image):
+    """[rgbe(image)] is the (H, W, 4) uint8 shared-exponent encoding of the (H, W, 3) float [image]."""
+    image = np.maximum(np.asarray(image, dtype=np.float64), 0)
+    brightest = image.max(axis=2)
+    mantissa, exponent = np.frexp(brightest)
+    lit = brightest > 1e-32
+    scale = np.where(lit, mantissa * 256 / np.where(lit, brightest, 1), 0)
+    encoded = np.empty(image.shape[:2] + (4,), dtype=np.uint8)
+    encoded[..., :3] = np.minimum(image * scale[..., None], 255).astype(np.uint8)
+    encoded[..., 3] = np.where(lit, exponent + 128, 0).astype(np.uint8)
+    return encoded
+
+def write_hdr(path, image):
+    """[write_hdr(path, image)] saves the (H, W, 3) float [image] as the Radiance RGBE file [path].
+    NOTE: Scanlines use the run-length layout with literal runs only, which every reader accepts and which, unlike
+    flat scanlines, can never be mistaken for it."""
+    encoded = rgbe(image)
+    height, width = encoded.shape[:2]
+    header = F"#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n-Y {height} +X {width}\n".encode("ascii")
+    if not(8 <= width <= 0x7fff):
+        body = encoded.tobytes()
+    else:
+        starts = range(0, width, 128)
+        channel_bytes = len(starts) + width
+        lines = np.empty((height, 4 + 4 * channel_bytes), dtype=np.uint8)
+        lines[:, :4] = (2, 2, width >> 8, width & 0xff)
+        for channel in range(4):
+            base = 4 + channel * channel_bytes
+            for i, first in enumerate(starts):
+                count = min(128, width - first)
+                lines[:, base + i + first] = count
+                lines[:, base + i + first + 1:base + i + first + 1 + count] = encoded[:, first:first + count, channel]
+        body = lines.tobytes()
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(body)
+
+def read_hdr(path):
+    """[read_hdr(path)] is the (H, W, 3) float32 image of a Radiance file written by [write_hdr]."""
+    with open(path, "rb") as f:
+        data = f.read()
+    header_end = data.index(b"\n\n") + 2
+    size_end = data.index(b"\n", header_end)
+    _, height, _, width = data[header_end:size_end].split()
+    height, width = int(height), int(width)
+    body = np.frombuffer(data, dtype=np.uint8, offset=size_end + 1)
+    if not(8 <= width <= 0x7fff):
+        encoded = body.reshape(height, width, 4)
+    else:
+        starts = range(0, width, 128)
+        channel_bytes = len(starts) + width
+        lines = body.reshape(height, 4 + 4 * channel_bytes)
+        keep = np.ones(channel_bytes, dtype=bool)
+        keep[[i + first for i, first in enumerate(starts)]] = False
+        encoded = np.stack([lines[:, 4 + channel * channel_bytes:4 + (channel + 1) * channel_bytes][:, keep] \
+            for channel in range(4)], axis=2)
+    exponent = encoded[..., 3].astype(np.int64)
+    scale = np.where(exponent > 0, np.ldexp(1.0, exponent - 136), 0)
+    return ((encoded[..., :3] + 0.5) * scale[..., None]).astype(np.float32)
+
+def bake_key(directions, colors, width, kernel):
+    """[bake_key(directions, colors, width, kernel)] is the hex digest naming the texture of these inputs."""
+    digest = hashlib.sha1()
+    digest.update(F"{BAKE_VERSION} {int(width)} {float(kernel)!r}".encode("ascii"))
+    digest.update(np.ascontiguousarray(directions, dtype=np.float32).tobytes())
+    digest.update(np.ascontiguousarray(colors, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+def bake_sky(directions, colors, directory, width=1024, kernel=1.0):
+    """[bake_sky(directions, colors, directory, width, kernel)] is the path of the [rasterize]d sky of these
+    samples as a .hdr file in [directory]; a texture baked from the same inputs before is reused as it is.
+    With no samples the sky is black."""
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    path = os.path.join(directory, F"sunvec_sky_{bake_key(directions, colors, width, kernel)[:16]}.hdr")
+    if os.path.exists(path):
+        PROFILER.count("sky cache hits")
+        return path
+    PROFILER.count("sky bakes")
+    with PROFILER.span("bake"):
+        image = rasterize(directions, colors, width, kernel)
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and moved in place, so a reader never sees half a texture under the final name.
+        partial = F"{path}.{os.getpid()}.tmp"
+        write_hdr(partial, image)
+        os.replace(partial, path)
+    return path
+
+def remove_skies(paths):
+    """[remove_skies(paths)] deletes the baked textures [paths] that still exist; a later bake of the same inputs
+    simply writes them again."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,7 @@
 from enum import Enum
+from functools import lru_cache
 from math import cos, pi, sin, sqrt
-from jolly.sunvec.setting import SettingRange
+import numpy as np
 
 GRAYSCALE = -1
 FULLCOLOR = 0
@@ -8,6 +9,8 @@ PROTANOPIA = 1
 DEUTERANOPIA = 2
 TRITANOPIA = 3
 
+PALETTE_CACHE_LIMIT = 4096  # Palettes of at most this many colors are cached; larger ones (~24 MB at 1M) are not kept.
+
 class Spectrum():
     def __init__(self, list_settings : list):
         self.length = len(list_settings)
@@ -91,6 +94,48 @@ class RingColor(Color):
             pow(-sqrt(3)/2 - sin(self.offset + (self.theta*(index/len(self)))),2) + \
             pow(-(1/2) - cos(self.offset + (self.theta*(index/len(self)))),2)
         ) / 2.25
+
+    def color_spectrum(self):
+        return [tuple(rgb) for rgb in ring_palette(len(self), self.vision_type, self.theta)]
+
+
+def ring_palette(n, vision_type, max_angle=(7/4)*pi):
+    """
+    [ring_palette(n, vision_type, max_angle)] is the read-only (n+1, 3) array whose row i is
+    RingColor(spectrum of length n, vision_type, max_angle).color(i), computed in one vectorized pass; cached
+    for n up to PALETTE_CACHE_LIMIT.
+    NOTE: GRAYSCALE rows are white.
+    """
+    if n <= PALETTE_CACHE_LIMIT:
+        return cached_ring_palette(n, vision_type, max_angle)
+    return compute_ring_palette(n, vision_type, max_angle)
+
+@lru_cache(maxsize=32)
+def cached_ring_palette(n, vision_type, max_angle):
+    return compute_ring_palette(n, vision_type, max_angle)
+
+def compute_ring_palette(n, vision_type, max_angle):
+    if vision_type == GRAYSCALE:
+        palette = np.ones((n + 1, 3))
+        palette.flags.writeable = False
+        return palette
+    ring = RingColor(Spectrum(range(n)), vision_type, max_angle)
+    angles = ring.offset + ring.theta * (np.arange(n + 1) / max(n, 1))
+    sines, cosines = np.sin(angles), np.cos(angles)
+    red = 1 - ((0 - sines)**2 + (1 - cosines)**2) / 2.25
+    green = 1 - ((sqrt(3)/2 - sines)**2 + (-(1/2) - cosines)**2) / 2.25
+    blue = 1 - ((-sqrt(3)/2 - sines)**2 + (-(1/2) - cosines)**2) / 2.25
+    yellow = (red + green)/2
+    cyan = (green + blue)/2
+
+    if vision_type == FULLCOLOR:
+        palette = np.stack((red, green, blue), axis=1)
+    elif vision_type == PROTANOPIA or vision_type == DEUTERANOPIA:
+        palette = np.stack(((red - cyan)/2, (red - cyan)/2, (blue - yellow)/2), axis=1)
+    elif vision_type == TRITANOPIA:
+        palette = np.stack((yellow - cyan, cyan - yellow, cyan - yellow), axis=1)
+    palette.flags.writeable = False
+    return palette
     
 
 
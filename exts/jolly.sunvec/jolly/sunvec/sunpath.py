@@ -0,0 +1,81 @@
+import numpy as np
+from jolly.sunvec.engines import ENGINE_STANDARD, engine_angles
+from jolly.sunvec.events import seasons
+from jolly.sunvec.setting import days_from_civil
+from jolly.sunvec.sunpos import sun_directions
+
+"""
+The sun-path diagram of a site and year as polylines on the unit sky sphere: the hourly analemmas, the daily arcs
+of the solstices and equinoxes, and one daily arc per month.
+
+Every vertex of every curve is solved in one vectorized call; each curve is then cut into its runs above the
+horizon, so a group of curves comes out as flat (points, counts, curve) arrays ready for one BasisCurves prim.
+"""
+
+ARC_STEP = 300  # Seconds between the vertices of a daily arc.
+MONTH_DAY = 21  # Monthly arcs are drawn on this day of every month, as on printed sun-path diagrams.
+HORIZON = 0.0  # Curves are cut where the sun's elevation crosses this many degrees.
+
+def analemma_daynums(year, timezone, hours=range(24)):
+    """[analemma_daynums(year, timezone, hours)] is the (len(hours), days) UTC daynums of every local clock hour in
+    [hours] on every day of [year]."""
+    first, last = days_from_civil(year, 1, 1), days_from_civil(year + 1, 1, 1)
+    days = np.arange(first, last, dtype=np.float64)
+    return days[None, :] + np.asarray(hours, dtype=np.float64)[:, None] / 24 - 0.5 - timezone / 24
+
+def arc_daynums(days, timezone, step=ARC_STEP):
+    """[arc_daynums(days, timezone, step)] is the (len(days), samples) UTC daynums of every local day in [days]
+    (see setting.days_from_civil) from midnight to midnight, every [step] seconds."""
+    offsets = np.arange(0, 86400 + 1, step, dtype=np.float64) / 86400
+    return np.asarray(days, dtype=np.float64)[:, None] + offsets[None, :] - 0.5 - timezone / 24
+
+def season_days(year, timezone):
+    """[season_days(year, timezone)] is the dict of the local day (see setting.days_from_civil) of every equinox
+    and solstice of [year], by name."""
+    return {name: int(np.floor(daynum + 0.5 + timezone / 24)) for name, daynum in seasons(year).items()}
+
+def month_days(year, day=MONTH_DAY):
+    """[month_days(year, day)] is the local day (see setting.days_from_civil) of [day] of every month of [year]."""
+    return [days_from_civil(year, month, day) for month in range(1, 13)]
+
+def horizon_runs(directions, closed=False):
+    """[horizon_runs(directions, closed)] is (points, counts, curve) for the (C, N, 3) curves [directions]: the
+    vertices of every run of at least two vertices above HORIZON, how many vertices each run has, and the row of
+    [directions] it came from. With [closed], a curve that never dips below the horizon repeats its first vertex."""
+    curves, length = directions.shape[:2]
+    above = directions[..., 2] > np.sin(np.radians(HORIZON))
+    if closed:
+        # Start every closed curve below the horizon, so no run is cut in two where the row begins.
+        order = (np.arange(length)[None, :] + np.argmin(above, axis=1)[:, None]) % length
+        directions = np.take_along_axis(directions, order[..., None], axis=1)
+        above = np.take_along_axis(above, order, axis=1)
+    edges = np.diff(np.pad(above, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    curve, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    counts = ends - starts
+    keep = counts >= 2
+    curve, starts, counts = curve[keep], starts[keep], counts[keep]
+    if closed:
+        counts = counts + (counts == length)
+    # Index of every vertex: its run's start plus its place within the run, wrapping round a closed curve.
+    run_of_vertex = np.repeat(np.arange(len(counts)), counts)
+    place = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    points = directions[curve[run_of_vertex], (starts[run_of_vertex] + place) % length]
+    return points, counts, curve
+
+def sun_path_curves(lat, long, timezone, year, step=ARC_STEP, engine=ENGINE_STANDARD, refraction=True):
+    """[sun_path_curves(lat, long, timezone, year, step, engine, refraction)] is a dict of the "analemmas" (one
+    per local clock hour), "seasons" (march equinox, june solstice, september equinox, december solstice) and
+    "months" (one per month) curve groups of [year] at the site, each as [horizon_runs] on the unit sky sphere
+    (+X east, +Y north, +Z up). The curve index of a run is its hour, season or month."""
+    analemmas = analemma_daynums(year, timezone)
+    arcs = arc_daynums(list(season_days(year, timezone).values()) + month_days(year), timezone, step)
+    azimuth, elevation = engine_angles(engine, np.concatenate((analemmas.ravel(), arcs.ravel())), lat, long, refraction)
+    directions = sun_directions(azimuth, elevation)
+    analemma_directions = directions[:analemmas.size].reshape(analemmas.shape + (3,))
+    arc_directions = directions[analemmas.size:].reshape(arcs.shape + (3,))
+    return {
+        "analemmas": horizon_runs(analemma_directions, closed=True),
+        "seasons": horizon_runs(arc_directions[:4]),
+        "months": horizon_runs(arc_directions[4:]),
+    }
@@ -1,5 +1,6 @@
 # sunpos.py
 import math
+import numpy as np
 def sunpos(when, location, refraction):
 # Extract the passed data
     year, month, day, hour, minute, second, timezone = when
@@ -62,6 +63,77 @@ def into_range(x, range_min, range_max):
     shiftedx = x - range_min
     delta = range_max - range_min
     return (((shiftedx % delta) + delta) % delta) + range_min
+def sunpos_batch(when, location, refraction):
+# Vectorized [sunpos]; [when] is an (N, 7) array of date tuples and [location]
+# is either one (latitude, longitude) pair or an (N, 2) array of them.
+# Returns (azimuth, elevation, directions) as NumPy arrays of shape (N,), (N,), (N, 3).
+    when = np.asarray(when, dtype=np.float64).reshape(-1, 7)
+    year, month, day = when[:, 0:3].astype(np.int64).T
+    hour, minute, second, timezone = when[:, 3:7].T
+    latitude, longitude = np.asarray(location, dtype=np.float64).reshape(-1, 2).T
+# Decimal hour of the day at Greenwich
+    greenwichtime = hour - timezone + minute / 60 + second / 3600
+# Days from J2000, accurate from 1901 to 2099
+    daynum = (
+        367 * year
+        - 7 * (year + (month + 9) // 12) // 4
+        + 275 * month // 9
+        + day
+        - 730531.5
+        + greenwichtime / 24
+    )
+    return sunpos_daynum(daynum, np.stack((latitude, longitude), axis=-1), refraction)
+def sunpos_daynum(daynum, location, refraction):
+# Vectorized [sunpos] for an array of days from J2000 [daynum] (UTC), e.g. [SettingArray.daynums()].
+    daynum = np.asarray(daynum, dtype=np.float64)
+    latitude, longitude = np.asarray(location, dtype=np.float64).reshape(-1, 2).T
+    azimuth, elevation = solar_angles(daynum, latitude, longitude, refraction)
+    return (azimuth, elevation, sun_directions(azimuth, elevation))
+def solar_angles(daynum, latitude, longitude, refraction):
+# Array form of the body of [sunpos] for days from J2000 [daynum]; angles in degrees.
+    rlat = np.radians(latitude)
+    sin, cos = np.sin, np.cos
+    decl, hour_ang = equatorial(daynum, longitude)
+# Local elevation and azimuth of the sun
+    elevation = np.arcsin(sin(decl) * sin(rlat) + cos(decl) * cos(rlat) * cos(hour_ang))
+    azimuth = np.arctan2(
+        -cos(decl) * cos(rlat) * sin(hour_ang),
+        sin(decl) - sin(rlat) * sin(elevation),
+    )
+    azimuth = into_range(np.degrees(azimuth), 0, 360)
+    elevation = into_range(np.degrees(elevation), -180, 180)
+# Refraction correction (optional)
+    if refraction:
+        targ = np.radians(elevation + (10.3 / (elevation + 5.11)))
+        elevation = elevation + (1.02 / np.tan(targ)) / 60
+    return (np.round(azimuth, 2), np.round(elevation, 2))
+def equatorial(daynum, longitude):
+# Declination and local hour angle of the sun in radians for days from J2000 [daynum] at [longitude] degrees.
+    rlon = np.radians(longitude)
+    sin, cos = np.sin, np.cos
+# Ecliptic longitude of the sun
+    eclip_long = ecliptic_longitude(daynum)
+# Obliquity of the ecliptic, right ascension and declination of the sun
+    obliquity = 0.4090877234 - 0.000000006981317008 * daynum
+    rasc = np.arctan2(cos(obliquity) * sin(eclip_long), cos(eclip_long))
+    decl = np.arcsin(sin(obliquity) * sin(eclip_long))
+# Local sidereal time and hour angle of the sun
+    sidereal = 4.894961213 + 6.300388099 * daynum + rlon
+    return (decl, sidereal - rasc)
+def ecliptic_longitude(daynum):
+# Ecliptic longitude of the sun in radians (not wrapped) for days from J2000 [daynum].
+    mean_long = daynum * 0.01720279239 + 4.894967873
+    mean_anom = daynum * 0.01720197034 + 6.240040768
+    return (
+        mean_long
+        + 0.03342305518 * np.sin(mean_anom)
+        + 0.0003490658504 * np.sin(2 * mean_anom)
+    )
+def sun_directions(azimuth, elevation):
+# Unit vectors (+X east, +Y north, +Z up) toward the sun for angles in degrees.
+    razi = np.radians(azimuth)
+    relv = np.radians(elevation)
+    return np.stack((np.sin(razi) * np.cos(relv), np.cos(razi) * np.cos(relv), np.sin(relv)), axis=-1)
 if __name__ == "__main__":
 # Close Encounters latitude, longitude
     location = (40.602778, -104.741667)
@@ -23,6 +23,9 @@ def read_float(field: ui.AbstractValueModel):
 def read_bool(field: ui.CheckBox):
     return(field.model.as_bool)
 
+def read_string(field: ui.StringField):
+    return(field.model.as_string)
+
 def separate(height=0):
     return (ui.Label(""), ui.Separator(height=height))
 
@@ -47,6 +50,13 @@ def float_field(name, min=0, max=10, *register_fns):
         trigger(new_element.model, response)
     return new_element
 
+def string_field(name, *register_fns):
+    ui.Label(name)
+    new_element = ui.StringField()
+    for trigger, response in register_fns:
+        trigger(new_element.model, response)
+    return new_element
+
 def button(name, clicked_fn, height=50, *register_fns):
     new_element = ui.Button(text=name, height=height, clicked_fn=lambda : clicked_fn())
     for trigger, response in register_fns:
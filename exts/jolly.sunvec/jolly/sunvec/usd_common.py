@@ -0,0 +1,442 @@
+import os
+import numpy as np
+from pxr import Gf, Sdf, Vt
+import omni.kit.commands
+import omni.usd
+from jolly.sunvec.profiling import PROFILER
+
+# NOTE: Everything here writes prim specs straight into a layer inside one Sdf.ChangeBlock,
+# so a whole set of suns costs a single stage notification instead of one per property.
+
+XFORM_OP_ORDER = ["xformOp:translate", "xformOp:rotateXYZ", "xformOp:scale"]
+
+def edit_layer():
+    """[edit_layer()] is the layer currently targeted for edits on the open stage."""
+    return omni.usd.get_context().get_stage().GetEditTarget().GetLayer()
+
+def write_attribute(layer, prim_path, name, type_name, value, variability=Sdf.VariabilityVarying):
+    """[write_attribute(layer, prim_path, name, type_name, value)] sets the default of attribute [name]
+    on the prim spec at [prim_path], creating the attribute spec if it does not exist yet."""
+    PROFILER.count("attributes written")
+    attr = layer.GetAttributeAtPath(prim_path.AppendProperty(name))
+    if not attr:
+        attr = Sdf.AttributeSpec(layer.GetPrimAtPath(prim_path), name, type_name, variability)
+    attr.default = value
+
+def write_sun(layer, prim_path, rotation, color, intensity):
+    """[write_sun(layer, prim_path, rotation, color, intensity)] authors a DistantLight spec at [prim_path]
+    pointing along the spherical [rotation] with emission [color] and [intensity].
+    NOTE: On an existing spec, any of [rotation], [color], [intensity] may be None to leave it untouched."""
+    prim = layer.GetPrimAtPath(prim_path)
+    if not prim:
+        PROFILER.count("prims created")
+        prim = Sdf.CreatePrimInLayer(layer, prim_path)
+        prim.specifier = Sdf.SpecifierDef
+        prim.typeName = "DistantLight"
+        write_attribute(layer, prim_path, "angle", Sdf.ValueTypeNames.Float, 1.0)
+        write_attribute(layer, prim_path, "xformOp:translate", Sdf.ValueTypeNames.Double3, Gf.Vec3d(0, 0, 0))
+        write_attribute(layer, prim_path, "xformOp:scale", Sdf.ValueTypeNames.Double3, Gf.Vec3d(1, 1, 1))
+        write_attribute(layer, prim_path, "xformOpOrder", Sdf.ValueTypeNames.TokenArray, XFORM_OP_ORDER, \
+            Sdf.VariabilityUniform)
+    if color is not None:
+        write_attribute(layer, prim_path, "color", Sdf.ValueTypeNames.Color3f, Gf.Vec3f(*color))
+    if intensity is not None:
+        write_attribute(layer, prim_path, "intensity", Sdf.ValueTypeNames.Float, float(intensity))
+    if rotation is not None:
+        write_attribute(layer, prim_path, "xformOp:rotateXYZ", Sdf.ValueTypeNames.Double3, Gf.Vec3d(*rotation))
+
+def remove_prim(layer, prim_path):
+    """[remove_prim(layer, prim_path)] removes the prim spec at [prim_path] and everything below it."""
+    prim = layer.GetPrimAtPath(prim_path)
+    if prim:
+        PROFILER.count("prims deleted")
+        prim.realNameParent.RemoveNameChild(prim)
+
+def ensure_parent(layer, prim_path):
+    """[ensure_parent(layer, prim_path)] makes sure the parent of [prim_path] has a spec in [layer]."""
+    parent_path = prim_path.GetParentPath()
+    if parent_path != Sdf.Path.absoluteRootPath:
+        Sdf.CreatePrimInLayer(layer, parent_path)
+
+def define_scope(layer, path):
+    """[define_scope(layer, path)] defines a Scope at [path] unless [layer] already has a spec there."""
+    if not layer.GetPrimAtPath(path):
+        scope = Sdf.CreatePrimInLayer(layer, path)
+        scope.specifier = Sdf.SpecifierDef
+        scope.typeName = "Scope"
+
+def present_prims(path, names):
+    """[present_prims(path, names)] is the set of [names] that have a prim spec under [path] in the edit layer."""
+    layer = edit_layer()
+    return {name for name in names if layer.GetPrimAtPath(f"{path}{name}")}
+
+def authored_value(layer, prim_path, name):
+    """[authored_value(layer, prim_path, name)] is the default of attribute [name] on the prim spec at [prim_path]
+    in [layer], or None if it is not authored there."""
+    attr = layer.GetAttributeAtPath(prim_path.AppendProperty(name))
+    return attr.default if attr else None
+
+def matching_suns(path, suns, tolerance=1e-5):
+    """[matching_suns(path, suns)] is the set of names in [suns], a dict name -> (rotation, color, intensity), whose
+    DistantLight under [path] in the edit layer still holds those values; suns deleted or changed behind our back
+    (e.g. by an undo or a new stage) are left out."""
+    layer = edit_layer()
+    matching = set()
+    for name, sun in suns.items():
+        prim_path = Sdf.Path(f"{path}{name}")
+        if not layer.GetPrimAtPath(prim_path):
+            continue
+        authored = [authored_value(layer, prim_path, attr) for attr in ("xformOp:rotateXYZ", "color", "intensity")]
+        if any(value is None for value in authored):
+            continue
+        if all(np.allclose(np.asarray(value, dtype=np.float64), np.asarray(expected, dtype=np.float64), \
+                rtol=tolerance, atol=tolerance) for value, expected in zip(authored, sun)):
+            matching.add(name)
+    return matching
+
+def write_suns(layer, path, suns, removals=()):
+    """[write_suns(layer, path, suns, removals)] authors every sun in [suns], a dict of
+    name -> (rotation, color, intensity), and removes every name in [removals], all under [path]."""
+    with Sdf.ChangeBlock():
+        define_scope(layer, Sdf.Path(path.rstrip("/")))
+        for name in removals:
+            remove_prim(layer, Sdf.Path(f"{path}{name}"))
+        for name, (rotation, color, intensity) in suns.items():
+            write_sun(layer, Sdf.Path(f"{path}{name}"), rotation, color, intensity)
+
+def write_points(layer, prim_path, points, colors, width):
+    """[write_points(layer, prim_path, points, colors, width)] authors one Points prim at [prim_path] with a
+    marker of [width] at every row of the (N, 3) array [points], colored by the rows of the (N, 3) array [colors]."""
+    points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3)
+    colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 3)
+    with Sdf.ChangeBlock():
+        prim = layer.GetPrimAtPath(prim_path)
+        if not prim:
+            PROFILER.count("prims created")
+            prim = Sdf.CreatePrimInLayer(layer, prim_path)
+            prim.specifier = Sdf.SpecifierDef
+            prim.typeName = "Points"
+        write_attribute(layer, prim_path, "points", Sdf.ValueTypeNames.Point3fArray, Vt.Vec3fArray.FromNumpy(points))
+        write_attribute(layer, prim_path, "widths", Sdf.ValueTypeNames.FloatArray, \
+            Vt.FloatArray.FromNumpy(np.full(len(points), width, dtype=np.float32)))
+        write_attribute(layer, prim_path, "primvars:displayColor", Sdf.ValueTypeNames.Color3fArray, \
+            Vt.Vec3fArray.FromNumpy(colors))
+        layer.GetAttributeAtPath(prim_path.AppendProperty("primvars:displayColor")).SetInfo("interpolation", "vertex")
+        bounds = np.stack((points.min(axis=0), points.max(axis=0))) if len(points) else np.zeros((2, 3), np.float32)
+        write_attribute(layer, prim_path, "extent", Sdf.ValueTypeNames.Float3Array, Vt.Vec3fArray.FromNumpy(bounds))
+
+def write_curves(layer, prim_path, points, counts, colors, width):
+    """[write_curves(layer, prim_path, points, counts, colors, width)] authors one linear BasisCurves prim at
+    [prim_path] whose curves take [counts] vertices in turn from the (N, 3) array [points], each curve [width] wide
+    and colored by its row of the (len(counts), 3) array [colors]."""
+    points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3)
+    counts = np.ascontiguousarray(counts, dtype=np.int32)
+    colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 3)
+    with Sdf.ChangeBlock():
+        prim = layer.GetPrimAtPath(prim_path)
+        if not prim:
+            PROFILER.count("prims created")
+            prim = Sdf.CreatePrimInLayer(layer, prim_path)
+            prim.specifier = Sdf.SpecifierDef
+            prim.typeName = "BasisCurves"
+            write_attribute(layer, prim_path, "type", Sdf.ValueTypeNames.Token, "linear", Sdf.VariabilityUniform)
+        write_attribute(layer, prim_path, "points", Sdf.ValueTypeNames.Point3fArray, Vt.Vec3fArray.FromNumpy(points))
+        write_attribute(layer, prim_path, "curveVertexCounts", Sdf.ValueTypeNames.IntArray, Vt.IntArray.FromNumpy(counts))
+        write_attribute(layer, prim_path, "widths", Sdf.ValueTypeNames.FloatArray, Vt.FloatArray([float(width)]))
+        layer.GetAttributeAtPath(prim_path.AppendProperty("widths")).SetInfo("interpolation", "constant")
+        write_attribute(layer, prim_path, "primvars:displayColor", Sdf.ValueTypeNames.Color3fArray, \
+            Vt.Vec3fArray.FromNumpy(colors))
+        layer.GetAttributeAtPath(prim_path.AppendProperty("primvars:displayColor")).SetInfo("interpolation", "uniform")
+        bounds = np.stack((points.min(axis=0), points.max(axis=0))) if len(points) else np.zeros((2, 3), np.float32)
+        bounds += np.float32(width / 2) * np.array([[-1], [1]], dtype=np.float32)
+        write_attribute(layer, prim_path, "extent", Sdf.ValueTypeNames.Float3Array, Vt.Vec3fArray.FromNumpy(bounds))
+
+def write_dome(layer, prim_path, texture, intensity, rotation):
+    """[write_dome(layer, prim_path, texture, intensity, rotation)] authors a DomeLight spec at [prim_path] lit by
+    the lat-long image file [texture] at [intensity], turned by the rotateXYZ [rotation] (see skybake.py)."""
+    with Sdf.ChangeBlock():
+        prim = layer.GetPrimAtPath(prim_path)
+        if not prim:
+            PROFILER.count("prims created")
+            prim = Sdf.CreatePrimInLayer(layer, prim_path)
+            prim.specifier = Sdf.SpecifierDef
+            prim.typeName = "DomeLight"
+            write_attribute(layer, prim_path, "texture:format", Sdf.ValueTypeNames.Token, "latlong")
+            write_attribute(layer, prim_path, "xformOp:translate", Sdf.ValueTypeNames.Double3, Gf.Vec3d(0, 0, 0))
+            write_attribute(layer, prim_path, "xformOp:scale", Sdf.ValueTypeNames.Double3, Gf.Vec3d(1, 1, 1))
+            write_attribute(layer, prim_path, "xformOpOrder", Sdf.ValueTypeNames.TokenArray, XFORM_OP_ORDER, \
+                Sdf.VariabilityUniform)
+        write_attribute(layer, prim_path, "texture:file", Sdf.ValueTypeNames.Asset, Sdf.AssetPath(texture))
+        write_attribute(layer, prim_path, "intensity", Sdf.ValueTypeNames.Float, float(intensity))
+        write_attribute(layer, prim_path, "xformOp:rotateXYZ", Sdf.ValueTypeNames.Double3, Gf.Vec3d(*rotation))
+
+def write_curve_group(layer, path, curves):
+    """[write_curve_group(layer, path, curves)] authors every BasisCurves prim in [curves], a dict of
+    name -> (points, counts, colors, width) (see [write_curves]), under [path] in one batched change."""
+    with Sdf.ChangeBlock():
+        define_scope(layer, Sdf.Path(path.rstrip("/")))
+        for name, (points, counts, colors, width) in curves.items():
+            write_curves(layer, Sdf.Path(f"{path}{name}"), points, counts, colors, width)
+
+def define_ancestors(layer, path):
+    """[define_ancestors(layer, path)] gives [path] and every prim above it a typeless def in [layer], so the
+    layer's prims exist on their own (e.g. referenced) and defer to the stage's types when sublayered."""
+    for prefix in path.GetPrefixes():
+        if not layer.GetPrimAtPath(prefix):
+            Sdf.CreatePrimInLayer(layer, prefix).specifier = Sdf.SpecifierDef
+
+def export_layer(file_path, path, suns=None, markers=None, animation=None, dome=None):
+    """[export_layer(file_path, path, suns, markers, animation, dome)] replaces everything under [path] in the layer
+    file [file_path] (.usdc, .usda or .usd, created if missing) with [suns] (see [write_suns]), the marker cloud
+    [markers], a tuple (name, points, colors, width) (see [write_points]), the animated sun [animation], a tuple
+    (name, timecodes, rotations, colors, intensities) (see [write_animated_sun]), and the baked sky [dome], a tuple
+    (name, texture, intensity, rotation) (see [write_dome]), and saves it; it is the layer.
+    NOTE: A layer the stage already uses is edited in place, so attached sublayers update without a reload."""
+    layer = Sdf.Layer.FindOrOpen(file_path) if os.path.exists(file_path) else None
+    if layer is None:
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        layer = Sdf.Layer.CreateNew(file_path)
+    scope_path = Sdf.Path(path.rstrip("/"))
+    with Sdf.ChangeBlock():
+        remove_prim(layer, scope_path)
+        define_ancestors(layer, scope_path.GetParentPath())
+        write_suns(layer, path, suns or {})
+        if markers is not None:
+            name, points, colors, width = markers
+            write_points(layer, Sdf.Path(f"{path}{name}"), points, colors, width)
+        if animation is not None:
+            name, timecodes, rotations, colors, intensities = animation
+            write_animated_sun(layer, Sdf.Path(f"{path}{name}"), timecodes, rotations, colors, intensities)
+            write_time_range(layer, timecodes[0], timecodes[-1])
+        if dome is not None:
+            name, texture, intensity, rotation = dome
+            write_dome(layer, Sdf.Path(f"{path}{name}"), texture, intensity, rotation)
+        layer.defaultPrim = scope_path.GetPrefixes()[0].name
+    layer.Save()
+    return layer
+
+def attach_layer(file_path):
+    """[attach_layer(file_path)] adds the layer file [file_path] as the strongest sublayer of the open stage's root
+    layer, unless it is there already."""
+    root = omni.usd.get_context().get_stage().GetRootLayer()
+    if file_path not in root.subLayerPaths:
+        root.subLayerPaths.insert(0, file_path)
+
+def detach_layer(file_path):
+    """[detach_layer(file_path)] removes the layer file [file_path] from the open stage's root layer sublayers."""
+    root = omni.usd.get_context().get_stage().GetRootLayer()
+    if file_path in root.subLayerPaths:
+        root.subLayerPaths.remove(file_path)
+
+def write_animated_sun(layer, prim_path, timecodes, rotations, colors, intensities):
+    """[write_animated_sun(layer, prim_path, timecodes, rotations, colors, intensities)] authors one DistantLight
+    spec at [prim_path] whose rotation, color and intensity are time-sampled at [timecodes] from the rows of the
+    (N, 3) [rotations], (N, 3) [colors] and (N,) [intensities]; earlier samples are dropped."""
+    timecodes = np.asarray(timecodes, dtype=np.float64).tolist()
+    rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3).tolist()
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3).tolist()
+    intensities = np.asarray(intensities, dtype=np.float64).tolist()
+    with Sdf.ChangeBlock():
+        remove_prim(layer, prim_path)
+        write_sun(layer, prim_path, rotations[0], colors[0], intensities[0])
+        for name, values, value_of in (("xformOp:rotateXYZ", rotations, lambda row: Gf.Vec3d(*row)), \
+                ("color", colors, lambda row: Gf.Vec3f(*row)), ("intensity", intensities, float)):
+            attr_path = prim_path.AppendProperty(name)
+            for time, value in zip(timecodes, values):
+                layer.SetTimeSample(attr_path, time, value_of(value))
+            PROFILER.count("time samples written", len(timecodes))
+
+def write_time_range(layer, start, end):
+    """[write_time_range(layer, start, end)] sets the playback range of [layer] to timecodes [start] to [end]."""
+    layer.startTimeCode = float(start)
+    layer.endTimeCode = float(end)
+
+def snapshot_prims(layer, prim_paths):
+    """[snapshot_prims(layer, prim_paths)] copies the current specs at [prim_paths] into an anonymous layer
+    so that they can be put back by [restore_prims]; paths with no spec are remembered as absent."""
+    snapshot = Sdf.Layer.CreateAnonymous()
+    existed = []
+    for prim_path in prim_paths:
+        if layer.GetPrimAtPath(prim_path):
+            ensure_parent(snapshot, prim_path)
+            Sdf.CopySpec(layer, prim_path, snapshot, prim_path)
+            existed.append((prim_path, True))
+        else:
+            existed.append((prim_path, False))
+    return snapshot, existed
+
+def restore_prims(layer, snapshot):
+    """[restore_prims(layer, snapshot)] returns the specs recorded by [snapshot_prims] to [layer]."""
+    snapshot_layer, existed = snapshot
+    with Sdf.ChangeBlock():
+        for prim_path, was_there in existed:
+            remove_prim(layer, prim_path)
+            if was_there:
+                ensure_parent(layer, prim_path)
+                Sdf.CopySpec(snapshot_layer, prim_path, layer, prim_path)
+
+
+class AuthorSunsCommand(omni.kit.commands.Command):
+    """
+    Writes a whole set of suns (see [write_suns]) as a single undo entry.
+    Only the prims touched by the command are kept for undo, not the values of the whole set.
+    """
+    def __init__(self, path, suns, removals=()):
+        self._path = path
+        self._suns = suns
+        self._removals = removals
+        self._layer = None
+        self._snapshot = None
+
+    def do(self):
+        self._layer = edit_layer()
+        touched = [Sdf.Path(f"{self._path}{name}") for name in list(self._removals) + list(self._suns)]
+        self._snapshot = snapshot_prims(self._layer, touched)
+        write_suns(self._layer, self._path, self._suns, self._removals)
+
+    def undo(self):
+        restore_prims(self._layer, self._snapshot)
+
+
+class AuthorPointsCommand(omni.kit.commands.Command):
+    """
+    Writes a marker cloud (see [write_points]) as a single undo entry.
+    """
+    def __init__(self, path, name, points, colors, width):
+        self._prim_path = Sdf.Path(f"{path}{name}")
+        self._points = points
+        self._colors = colors
+        self._width = width
+        self._layer = None
+        self._snapshot = None
+
+    def do(self):
+        self._layer = edit_layer()
+        self._snapshot = snapshot_prims(self._layer, [self._prim_path])
+        with Sdf.ChangeBlock():
+            define_scope(self._layer, self._prim_path.GetParentPath())
+            write_points(self._layer, self._prim_path, self._points, self._colors, self._width)
+
+    def undo(self):
+        restore_prims(self._layer, self._snapshot)
+
+
+class AuthorAnimatedSunCommand(omni.kit.commands.Command):
+    """
+    Writes a time-sampled sun (see [write_animated_sun]) as a single undo entry.
+    """
+    def __init__(self, path, name, timecodes, rotations, colors, intensities):
+        self._prim_path = Sdf.Path(f"{path}{name}")
+        self._samples = (timecodes, rotations, colors, intensities)
+        self._layer = None
+        self._snapshot = None
+
+    def do(self):
+        self._layer = edit_layer()
+        self._snapshot = snapshot_prims(self._layer, [self._prim_path])
+        with Sdf.ChangeBlock():
+            define_scope(self._layer, self._prim_path.GetParentPath())
+            write_animated_sun(self._layer, self._prim_path, *self._samples)
+
+    def undo(self):
+        restore_prims(self._layer, self._snapshot)
+
+
+class AuthorCurvesCommand(omni.kit.commands.Command):
+    """
+    Writes a group of BasisCurves prims (see [write_curves]) as a single undo entry.
+    """
+    def __init__(self, path, curves):
+        self._path = path
+        self._curves = curves
+        self._layer = None
+        self._snapshot = None
+
+    def do(self):
+        self._layer = edit_layer()
+        self._snapshot = snapshot_prims(self._layer, [Sdf.Path(f"{self._path}{name}") for name in self._curves])
+        write_curve_group(self._layer, self._path, self._curves)
+
+    def undo(self):
+        restore_prims(self._layer, self._snapshot)
+
+
+class AuthorDomeCommand(omni.kit.commands.Command):
+    """
+    Writes a baked sky DomeLight (see [write_dome]) as a single undo entry.
+    """
+    def __init__(self, path, name, texture, intensity, rotation):
+        self._prim_path = Sdf.Path(f"{path}{name}")
+        self._dome = (texture, intensity, rotation)
+        self._layer = None
+        self._snapshot = None
+
+    def do(self):
+        self._layer = edit_layer()
+        self._snapshot = snapshot_prims(self._layer, [self._prim_path])
+        with Sdf.ChangeBlock():
+            define_scope(self._layer, self._prim_path.GetParentPath())
+            write_dome(self._layer, self._prim_path, *self._dome)
+
+    def undo(self):
+        restore_prims(self._layer, self._snapshot)
+
+
+def author_suns(path, suns, removals=(), undoable=True):
+    """[author_suns(path, suns, removals, undoable)] writes [suns] and removes [removals] under [path] in one
+    batched change; with [undoable] the whole set is recorded as one entry on the undo stack."""
+    if undoable:
+        PROFILER.count("commands")
+        omni.kit.commands.execute("AuthorSuns", path=path, suns=suns, removals=removals)
+    else:
+        write_suns(edit_layer(), path, suns, removals)
+
+def author_points(path, name, points, colors, width, undoable=True):
+    """[author_points(path, name, points, colors, width, undoable)] writes the marker cloud [name] under [path]
+    as one prim; with [undoable] it is recorded as one entry on the undo stack."""
+    if undoable:
+        PROFILER.count("commands")
+        omni.kit.commands.execute("AuthorPoints", path=path, name=name, points=points, colors=colors, width=width)
+    else:
+        layer = edit_layer()
+        prim_path = Sdf.Path(f"{path}{name}")
+        with Sdf.ChangeBlock():
+            define_scope(layer, prim_path.GetParentPath())
+            write_points(layer, prim_path, points, colors, width)
+
+def author_animated_sun(path, name, timecodes, rotations, colors, intensities, undoable=True):
+    """[author_animated_sun(path, name, timecodes, rotations, colors, intensities, undoable)] writes the
+    time-sampled sun [name] under [path] in one batched change; with [undoable] it is one entry on the undo stack."""
+    if undoable:
+        PROFILER.count("commands")
+        omni.kit.commands.execute("AuthorAnimatedSun", path=path, name=name, timecodes=timecodes, \
+            rotations=rotations, colors=colors, intensities=intensities)
+    else:
+        layer = edit_layer()
+        prim_path = Sdf.Path(f"{path}{name}")
+        with Sdf.ChangeBlock():
+            define_scope(layer, prim_path.GetParentPath())
+            write_animated_sun(layer, prim_path, timecodes, rotations, colors, intensities)
+
+def author_dome(path, name, texture, intensity, rotation, undoable=True):
+    """[author_dome(path, name, texture, intensity, rotation, undoable)] writes the baked sky DomeLight [name]
+    under [path] lit by the image file [texture]; with [undoable] it is one entry on the undo stack."""
+    if undoable:
+        PROFILER.count("commands")
+        omni.kit.commands.execute("AuthorDome", path=path, name=name, texture=texture, intensity=intensity, \
+            rotation=rotation)
+    else:
+        layer = edit_layer()
+        prim_path = Sdf.Path(f"{path}{name}")
+        with Sdf.ChangeBlock():
+            define_scope(layer, prim_path.GetParentPath())
+            write_dome(layer, prim_path, texture, intensity, rotation)
+
+def author_curves(path, curves, undoable=True):
+    """[author_curves(path, curves, undoable)] writes the BasisCurves prims [curves] (see [write_curve_group])
+    under [path] in one batched change; with [undoable] they are one entry on the undo stack."""
+    if undoable:
+        PROFILER.count("commands")
+        omni.kit.commands.execute("AuthorCurves", path=path, curves=curves)
+    else:
+        write_curve_group(edit_layer(), path, curves)
@@ -1,6 +1,6 @@
-from math import cos, pi, sin
+from math import acos, atan2, cos, pi, sin
 
-from pxr import Gf
+# NOTE: pxr is imported where a Gf vector is built so the pure math here loads without USD.
 
 def rad(x: float):
     return(x*pi/180)
@@ -9,14 +9,20 @@ def deg(x: float):
     return(x*180/pi)
 
 def scale_vec(vec, n):
+    from pxr import Gf
     x, y, z = vec
     return Gf.Vec3d(x * n, y * n, z * n)
 
 def theta_phi_to_spherical(theta, phi): 
+    from pxr import Gf
     return Gf.Vec3d(-deg(phi),0,-deg(theta))
 
 def theta_phi_to_cartesian(theta, phi):
+    from pxr import Gf
     return Gf.Vec3d(sin(theta)*sin(phi),cos(theta)*sin(phi),cos(phi))
 
 def theta_phi_to_xyz(theta, phi):
     return sin(theta)*sin(phi), cos(theta)*sin(phi), cos(phi)
+
+def xyz_to_theta_phi(x, y, z):
+    return atan2(x, y), acos(max(-1.0, min(1.0, z)))
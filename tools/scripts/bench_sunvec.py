@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+import types
+
+# Micro-benchmarks for the jolly.sunvec hot paths; runs with plain Python + NumPy, no Kit required.
+#   > python tools/scripts/bench_sunvec.py [--quick] [--json bench_output.json]
+
+EXT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "exts", "jolly.sunvec")
+
+
+class CommandCounter:
+    """Stand-in for omni.kit.commands that records every command instead of running it."""
+
+    def __init__(self):
+        self.issued = []
+
+    class Command:
+        pass
+
+    def execute(self, command_name, **kwargs):
+        self.issued.append(command_name)
+        return (True, None)
+
+    def register(self, command):
+        pass
+
+    def unregister(self, command):
+        pass
+
+
+COMMANDS = CommandCounter()
+
+
+def install_kit_stand_ins():
+    """Puts minimal omni/pxr modules in sys.modules so jolly.sunvec can be imported outside Kit."""
+
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    class Anything:
+        def __init__(self, *args, **kwargs):
+            self.args = args
+
+        def __getattr__(self, name):
+            return Anything()
+
+        def __call__(self, *args, **kwargs):
+            return Anything()
+
+        def __iter__(self):
+            return iter(self.args)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    class Layer:
+        def GetPrimAtPath(self, path):
+            return None
+
+    class Stage:
+        def GetEditTarget(self):
+            return types.SimpleNamespace(GetLayer=Layer)
+
+    omni = module("omni")
+    omni.ext = module("omni.ext", IExt=object)
+    omni.ui = module("omni.ui", __getattr__=lambda name: Anything())
+    omni.kit = module("omni.kit")
+    omni.kit.commands = COMMANDS
+    sys.modules["omni.kit.commands"] = COMMANDS
+    omni.kit.app = module("omni.kit.app", get_app=Anything)
+    omni.timeline = module("omni.timeline", get_timeline_interface=Anything)
+    omni.usd = module("omni.usd", get_context=lambda: types.SimpleNamespace(get_stage=Stage))
+    pxr = module("pxr")
+    pxr.Gf = module("pxr.Gf", Vec3d=lambda *xyz: tuple(xyz), Vec3f=lambda *xyz: tuple(xyz))
+    pxr.Sdf = module("pxr.Sdf", Path=str, __getattr__=lambda name: Anything())
+    pxr.Vt = module("pxr.Vt", __getattr__=lambda name: Anything())
+
+
+def import_sunvec():
+    sys.path.insert(0, os.path.abspath(EXT_ROOT))
+    try:
+        import omni.kit.commands  # noqa: F401
+    except ImportError:
+        install_kit_stand_ins()
+    import jolly.sunvec.extension as extension
+    return extension
+
+
+RESULTS = []
+
+
+def bench(name, fn, number, repeat):
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    RESULTS.append({"name": name, "seconds_per_call": best})
+    print(f"{name:<56} {best * 1e6:14.2f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jolly.sunvec hot paths without Kit")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    extension = import_sunvec()
+    from jolly.sunvec.setting import Setting, SettingArray, SettingRange, Timespan
+    from jolly.sunvec.spectrum import FULLCOLOR, RingColor, Spectrum
+    from jolly.sunvec.sunpos import sunpos, sunpos_daynum
+    from jolly.sunvec.profiling import PROFILER
+
+    repeat = 2 if args.quick else 5
+    year_minutes = 24 * 60 * (30 if args.quick else 365)
+
+    start = Setting(42.4534, -76.4735, 2022, 1, 1, 0, 0, 0, -4)
+    end = Setting(42.4534, -76.4735, 2022, 12, 31, 23, 59, 0, -4)
+    one_hour = Timespan(0, 0, 0, 1, 0, 0)
+    one_minute = Timespan(0, 0, 0, 0, 1, 0)
+    five_years = Timespan(5, 0, 0, 0, 0, 0)
+
+    print("-- sunpos")
+    when, loc = start.get_date(), start.get_loc()
+    bench("sunpos (scalar)", lambda: sunpos(when, loc, True), 2000, repeat)
+    minutes = SettingRange(start, end).increment_until_array(one_minute, limit=year_minutes)
+    daynums = minutes.daynums()
+    bench(f"sunpos_daynum ({len(minutes)} samples)", lambda: sunpos_daynum(daynums, loc, True), 1, repeat)
+
+    from jolly.sunvec.engines import ENGINE_NAMES, engine_angles
+    for engine, name in enumerate(ENGINE_NAMES):
+        bench(f"engine {name} ({len(minutes)} samples)", lambda: engine_angles(engine, daynums, *loc), 1, repeat)
+
+    print("-- SunposCache")
+    from jolly.sunvec.cache import SunposCache
+    utc = minutes.utc_epochs()
+    bench(f"lookup ({len(minutes)} samples), cold", lambda: SunposCache().lookup(utc, loc, True), 1, repeat)
+    warm = SunposCache()
+    warm.lookup(utc, loc, True)
+    bench(f"lookup ({len(minutes)} samples), warm", lambda: warm.lookup(utc, loc, True), 1, repeat)
+
+    print("-- Setting arithmetic")
+    bench("Setting + 1 hour", lambda: start + one_hour, 2000, repeat)
+    bench("Setting + 5 years", lambda: start + five_years, 2000, repeat)
+    bench("Setting - Setting", lambda: end - start, 2000, repeat)
+
+    print("-- SettingRange")
+    bench("subdiv_range(100)", lambda: SettingRange(start, end).subdiv_range(100), 20, repeat)
+    bench("increment_range(1 hour, 100)", lambda: SettingRange(start, end).increment_range(one_hour, 100), 20, repeat)
+    bench("increment_until_range(1 hour)", lambda: SettingRange(start, end).increment_until_range(one_hour), 20, repeat)
+    bench(f"subdiv_array({year_minutes})", lambda: SettingRange(start, end).subdiv_array(year_minutes), 5, repeat)
+    bench(f"increment_until_chunks(1 minute) -> {len(minutes)}",
+          lambda: SettingArray.concatenate(SettingRange(start, end).increment_until_chunks(one_minute)), 1, repeat)
+
+    print("-- adaptive sampling")
+    from jolly.sunvec.sampling import adaptive_array, angle_between, directions_at
+    sampled = SettingRange(minutes[0], minutes[len(minutes) - 1])
+    adaptive = adaptive_array(sampled, 5.0)
+    bench(f"adaptive_array(5 degrees) -> {len(adaptive)}", lambda: adaptive_array(sampled, 5.0), 1, repeat)
+    # Uniform steps need the sun's fastest motion to fit in one step; count how many that takes over the same range.
+    per_minute = directions_at(minutes.utc_epochs(), start.lat, start.long)
+    fastest = angle_between(per_minute[:-1], per_minute[1:]).max()
+    uniform = int(len(minutes) * fastest / 5.0) + 1
+    print(f"{'suns for 5 degree spacing, uniform vs adaptive':<56} {uniform:>8} vs {len(adaptive)}")
+    RESULTS.append({"name": "suns for 5 degree spacing", "uniform": uniform, "adaptive": len(adaptive)})
+
+    print("-- baked sky")
+    import tempfile
+    import numpy as np
+    from jolly.sunvec.skybake import bake_sky, rasterize, write_hdr
+    sky_colors = np.ones_like(per_minute)
+    for width in (512, 1024, 2048):
+        bench(f"rasterize({len(per_minute)} suns, {width} wide)", lambda: rasterize(per_minute, sky_colors, width, 1.0), 1, repeat)
+    sky = rasterize(per_minute, sky_colors, 1024, 1.0)
+    with tempfile.TemporaryDirectory() as sky_dir:
+        bench("write_hdr(1024 wide)", lambda: write_hdr(os.path.join(sky_dir, "sky.hdr"), sky), 1, repeat)
+        bake_sky(per_minute, sky_colors, sky_dir, 1024, 1.0)
+        bench("bake_sky(1024 wide), cached", lambda: bake_sky(per_minute, sky_colors, sky_dir, 1024, 1.0), 1, repeat)
+
+    print("-- RingColor")
+    for count in (100, 10000):
+        ring = RingColor(Spectrum(range(count)), FULLCOLOR)
+        bench(f"color_spectrum ({count} suns)", ring.color_spectrum, 1, repeat)
+
+    print("-- kit commands per position_suns")
+    sunvec = extension.SunVec()
+    sunvec.sunpos_cache = SunposCache(sunvec.cache_bytes)  # Created by on_startup in Kit.
+    sunvec.setting_start, sunvec.setting_end = start, Setting(42.4534, -76.4735, 2022, 1, 2, 0, 0, 0, -4)
+    sunvec.inc_steps = 100
+    sunvec.color_toggle = True
+    for bulk in (False, True):
+        sunvec.bulk_authoring = bulk
+        sunvec.live_suns = {}
+        COMMANDS.issued = []
+        sunvec.position_suns()
+        label = "bulk" if bulk else "per-sun"
+        print(f"position_suns, {sunvec.inc_steps + 1} suns, {label:<8} {len(COMMANDS.issued):>22} commands")
+        RESULTS.append({"name": f"position_suns commands ({label})", "commands": len(COMMANDS.issued)})
+
+    with tempfile.TemporaryDirectory() as sky_dir:
+        sunvec.sky_dir = sky_dir
+        sunvec.visualization = extension.VIS_SKY
+        COMMANDS.issued = []
+        sunvec.position_suns()
+        print(f"position_suns, {sunvec.inc_steps + 1} suns, baked sky {len(COMMANDS.issued):>19} commands")
+        RESULTS.append({"name": "position_suns commands (baked sky)", "commands": len(COMMANDS.issued)})
+        sunvec.visualization = extension.VIS_LIGHTS
+
+    COMMANDS.issued = []
+    sunvec.draw_diagram()
+    print(f"{'draw_diagram, sun-path diagram':<44} {len(COMMANDS.issued):>12} commands")
+    RESULTS.append({"name": "draw_diagram commands", "commands": len(COMMANDS.issued)})
+    bench("plan_diagram (24 analemmas, 16 day arcs)", sunvec.plan_diagram, 5, repeat)
+
+    print("-- profiler spans per position_suns (bulk)")
+    PROFILER.reset()
+    PROFILER.enabled = True
+    sunvec.live_suns = {}
+    sunvec.position_suns()
+    PROFILER.enabled = False
+    for line in PROFILER.summary():
+        print(line)
+    RESULTS.append(dict(PROFILER.report(), name="position_suns profile (bulk)"))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(RESULTS, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()